@@ -0,0 +1,213 @@
+"""
+API读缓存 - 进程内 TTL+LRU 或 Redis, 爬虫写入后按标签失效
+"""
+
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from core.config import CacheConfig, RedisConfig, settings
+from core.logger import logger
+from core.singleflight import SingleFlight
+
+# 写入类型 -> (标签前缀, 主键字段, 列表标签)
+WRITE_TAGS = {
+    "video": ("video", "video_id", "videos"),
+    "user": ("user", "sec_uid", "users"),
+    "video_history": ("video_history", "video_id", None),
+    "user_history": ("user_history", "sec_uid", None),
+}
+
+
+def tags_for_write(kind: str, rows: Iterable[Dict[str, Any]]) -> Set[str]:
+    """爬虫写入的行对应需要失效的缓存标签"""
+    if kind not in WRITE_TAGS:
+        return set()
+    prefix, key_field, list_tag = WRITE_TAGS[kind]
+    tags = {f"{prefix}:{row[key_field]}" for row in rows if row.get(key_field)}
+    if tags and list_tag:
+        tags.add(list_tag)
+    return tags
+
+
+class MemoryCacheBackend:
+    """进程内 TTL+LRU 缓存"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any, Tuple[str, ...]]]" = (
+            OrderedDict()
+        )
+        self._tags: Dict[str, Set[str]] = {}
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value, _ = entry
+        if time.monotonic() >= expires_at:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float, tags: Iterable[str]) -> None:
+        self._remove(key)
+        tags = tuple(tags)
+        self._entries[key] = (time.monotonic() + ttl, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    async def invalidate(self, tags: Iterable[str]) -> int:
+        removed = 0
+        for tag in tags:
+            for key in self._tags.pop(tag, ()):
+                removed += self._remove(key)
+        return removed
+
+    def _remove(self, key: str) -> int:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return 0
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """Redis缓存, 标签用集合记录其下的缓存键, 多进程共享失效"""
+
+    def __init__(self, config: RedisConfig = None, client=None, prefix: str = ""):
+        config = config or settings.redis
+        if client is None:
+            import redis.asyncio as redis
+
+            client = redis.Redis(
+                host=config.host,
+                port=config.port,
+                db=config.db,
+                password=config.password,
+            )
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: float, tags: Iterable[str]) -> None:
+        key = self.prefix + key
+        pipe = self.client.pipeline()
+        pipe.set(key, json.dumps(value), px=int(ttl * 1000))
+        for tag in tags:
+            tag_key = f"{self.prefix}tag:{tag}"
+            pipe.sadd(tag_key, key)
+            pipe.pexpire(tag_key, int(ttl * 1000))
+        await pipe.execute()
+
+    async def invalidate(self, tags: Iterable[str]) -> int:
+        tag_keys = [f"{self.prefix}tag:{tag}" for tag in tags]
+        if not tag_keys:
+            return 0
+        pipe = self.client.pipeline()
+        for tag_key in tag_keys:
+            pipe.smembers(tag_key)
+        members = await pipe.execute()
+        keys = set().union(*members)
+        await self.client.delete(*keys, *tag_keys)
+        return len(keys)
+
+
+class ResponseCache:
+    """接口读缓存: 未命中时合并并发加载, 结果按JSON兼容形式保存"""
+
+    def __init__(self, backend, config: CacheConfig = None):
+        self.backend = backend
+        self.config = config or settings.cache
+        self._loads = SingleFlight()
+        self.stats = {"hits": 0, "misses": 0, "invalidated": 0, "errors": 0}
+
+    async def get_or_load(
+        self,
+        key: str,
+        tags: Iterable[str],
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+    ) -> Any:
+        """读缓存, 未命中时调用 loader 并写回; loader 返回 None 不缓存"""
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Cache read failed for {key}: {e}")
+            value = None
+        if value is not None:
+            self.stats["hits"] += 1
+            return value
+        self.stats["misses"] += 1
+        return await self._loads.do(key, lambda: self._load(key, tags, loader, ttl))
+
+    async def _load(self, key, tags, loader, ttl) -> Any:
+        value = await loader()
+        if value is None:
+            return None
+        if isinstance(value, BaseModel):
+            value = value.model_dump(mode="json")
+        else:
+            value = jsonable_encoder(value)
+        try:
+            await self.backend.set(key, value, ttl or self.config.ttl, tags)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Cache write failed for {key}: {e}")
+        return value
+
+    async def invalidate(self, tags: Iterable[str]) -> None:
+        tags = list(tags)
+        if not tags:
+            return
+        try:
+            self.stats["invalidated"] += await self.backend.invalidate(tags)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Cache invalidation failed: {e}")
+
+    async def on_write(self, grouped: Dict[str, List[Dict[str, Any]]]) -> None:
+        """爬虫写入提交后的回调"""
+        tags: Set[str] = set()
+        for kind, rows in grouped.items():
+            tags |= tags_for_write(kind, rows)
+        await self.invalidate(tags)
+
+    def metrics(self) -> Dict[str, Any]:
+        total = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "backend": type(self.backend).__name__,
+            "hit_rate": self.stats["hits"] / total if total else 0.0,
+        }
+
+
+def create_response_cache(config: CacheConfig = None) -> Optional[ResponseCache]:
+    """按配置创建缓存: redis.enabled 时用Redis, 否则进程内缓存"""
+    config = config or settings.cache
+    if not config.enabled:
+        return None
+    if settings.redis.enabled:
+        backend = RedisCacheBackend(settings.redis, prefix=config.key_prefix)
+    else:
+        backend = MemoryCacheBackend(config.max_entries)
+    return ResponseCache(backend, config)
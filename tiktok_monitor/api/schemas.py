@@ -0,0 +1,124 @@
+"""
+接口响应模型 - 声明 response_model 后由 pydantic-core 直接序列化为JSON字节
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, ConfigDict, model_validator
+from sqlalchemy import Row
+
+
+class RowModel(BaseModel):
+    """可从ORM对象、查询结果行或字典构造"""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _row_as_dict(cls, data: Any) -> Any:
+        # 结果行转为字典再校验, 比按属性逐个取值快
+        return data._asdict() if isinstance(data, Row) else data
+
+
+class VideoSchema(RowModel):
+    id: int
+    video_id: str
+    desc: Optional[str] = None
+    create_time: Optional[int] = None
+    digg_count: Optional[int] = None
+    share_count: Optional[int] = None
+    comment_count: Optional[int] = None
+    play_count: Optional[int] = None
+    collect_count: Optional[int] = None
+    author_id: Optional[str] = None
+    author_name: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class UserSchema(RowModel):
+    id: int
+    sec_uid: str
+    username: Optional[str] = None
+    nickname: Optional[str] = None
+    follower_count: Optional[int] = None
+    following_count: Optional[int] = None
+    likes_count: Optional[int] = None
+    video_count: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class VideoHistorySchema(RowModel):
+    id: int
+    video_id: str
+    digg_count: Optional[int] = None
+    share_count: Optional[int] = None
+    comment_count: Optional[int] = None
+    play_count: Optional[int] = None
+    collect_count: Optional[int] = None
+    crawled_at: datetime
+
+
+class UserHistorySchema(RowModel):
+    id: int
+    sec_uid: str
+    follower_count: Optional[int] = None
+    following_count: Optional[int] = None
+    likes_count: Optional[int] = None
+    video_count: Optional[int] = None
+    crawled_at: datetime
+
+
+class TaskSchema(RowModel):
+    id: int
+    task_type: str
+    target_id: str
+    name: Optional[str] = None
+    interval: Optional[int] = None
+    enabled: Optional[bool] = None
+    last_run: Optional[datetime] = None
+    last_status: Optional[str] = None
+    next_run_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class VideoPage(BaseModel):
+    videos: List[VideoSchema]
+    next_cursor: Optional[str] = None
+
+
+class UserPage(BaseModel):
+    users: List[UserSchema]
+    next_cursor: Optional[str] = None
+
+
+class TopVideos(BaseModel):
+    metric: str
+    videos: List[VideoSchema]
+
+
+class TopUsers(BaseModel):
+    metric: str
+    users: List[UserSchema]
+
+
+class VideoHistoryResponse(BaseModel):
+    video_id: str
+    history: List[VideoHistorySchema]
+
+
+class UserHistoryResponse(BaseModel):
+    sec_uid: str
+    history: List[UserHistorySchema]
+
+
+class TaskList(BaseModel):
+    tasks: List[TaskSchema]
+    effective_intervals: Dict[int, Optional[float]]
+
+
+class TaskResponse(BaseModel):
+    task: TaskSchema
@@ -2,32 +2,89 @@
 FastAPI 服务器
 """
 
-from fastapi import FastAPI, HTTPException, Depends
+from datetime import datetime
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from typing import List, Optional
+from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from storage.database import get_db, init_db
+from storage.export import (
+    EXPORT_FORMATS,
+    MEDIA_TYPES,
+    build_export_query,
+    parse_id_list,
+    stream_export,
+)
+from storage.leaderboard import Leaderboards
+from storage.state_cache import LastStateCache
+from storage.task_import import IMPORT_FORMATS, parse_tasks
+from storage.writer import WriteBehindWriter
 from storage.repositories import (
     VideoRepository,
     UserRepository,
+    VideoHistoryRepository,
+    UserHistoryRepository,
     MonitorTaskRepository,
 )
+from api.cache import create_response_cache
+from api.schemas import (
+    TaskList,
+    TaskResponse,
+    TopUsers,
+    TopVideos,
+    UserHistoryResponse,
+    UserPage,
+    UserSchema,
+    VideoHistoryResponse,
+    VideoPage,
+    VideoSchema,
+)
 from core.crawler import CrawlerManager
+from core.engine import CrawlEngine
+from core.jobs import CrawlJobManager
 from core.config import settings
+from core.metrics import CONTENT_TYPE, REGISTRY
+from scheduler.scheduler import Scheduler
 
 app = FastAPI(
     title="TikTok Monitor API", description="TikTok数据监控API", version="1.0.0"
 )
 
 
+video_repo = VideoRepository()
+user_repo = UserRepository()
+history_repo = VideoHistoryRepository()
+user_history_repo = UserHistoryRepository()
+task_repo = MonitorTaskRepository()
+crawler_manager = CrawlerManager(
+    cookie=settings.cookie,
+    proxy=settings.proxy,
+    writer=WriteBehindWriter() if settings.database.write_behind else None,
+    state_cache=LastStateCache(settings.monitoring.state_cache_size)
+    if settings.monitoring.change_detection
+    else None,
+)
+response_cache = create_response_cache()
+if response_cache is not None:
+    crawler_manager.add_write_listener(response_cache.on_write)
+leaderboards = Leaderboards()
+crawler_manager.add_write_listener(leaderboards.on_write)
+crawl_engine = CrawlEngine(crawler_manager)
+scheduler = Scheduler(crawl_engine)
+job_manager = CrawlJobManager(crawl_engine)
+
+
 @app.on_event("startup")
 async def startup():
     await init_db()
+    await crawl_engine.start()
 
 
-video_repo = VideoRepository()
-user_repo = UserRepository()
-task_repo = MonitorTaskRepository()
+@app.on_event("shutdown")
+async def shutdown():
+    await crawl_engine.stop()
 
 
 @app.get("/")
@@ -35,65 +92,303 @@ async def root():
     return {"message": "TikTok Monitor API", "docs": "/docs"}
 
 
-@app.get("/api/videos")
+async def cached(key: str, tags: List[str], loader):
+    """经读缓存加载, 未启用缓存时直接查询"""
+    if response_cache is None:
+        return await loader()
+    return await response_cache.get_or_load(key, tags, loader)
+
+
+async def list_page(
+    name: str, schema, repo, db, sort, order, limit, offset, cursor
+):
+    """列表接口的键集分页: 返回本页数据和 next_cursor"""
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
+
+    async def load():
+        rows, next_cursor = await repo.get_page(
+            db, sort, order == "desc", limit, cursor, offset
+        )
+        return schema.model_validate({name: rows, "next_cursor": next_cursor})
+
+    try:
+        return await cached(
+            f"{name}:{sort}:{order}:{limit}:{offset}:{cursor}", [name], load
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/videos", response_model=VideoPage)
 async def get_videos(
-    limit: int = 20, offset: int = 0, db: AsyncSession = Depends(get_db)
+    limit: int = 20,
+    offset: int = 0,
+    sort: str = "id",
+    order: str = "asc",
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    return await list_page(
+        "videos", VideoPage, video_repo, db, sort, order, limit, offset, cursor
+    )
+
+
+@app.get("/api/videos/top", response_model=TopVideos)
+async def get_top_videos(
+    metric: str = "play_count",
+    limit: int = 10,
+    author_id: Optional[str] = None,
+    window: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
 ):
-    videos = await video_repo.get_all(db, limit=limit, offset=offset)
-    return {"videos": videos}
+    try:
+        videos = await leaderboards.top(db, "video", metric, limit, author_id, window)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"metric": metric, "videos": videos}
 
 
-@app.get("/api/videos/{video_id}")
+@app.get("/api/videos/{video_id}", response_model=VideoSchema)
 async def get_video(video_id: str, db: AsyncSession = Depends(get_db)):
-    video = await video_repo.get_by_video_id(db, video_id)
+    async def load():
+        video = await video_repo.get_by_video_id(db, video_id)
+        return VideoSchema.model_validate(video) if video else None
+
+    video = await cached(f"video:{video_id}", [f"video:{video_id}"], load)
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
     return video
 
 
-@app.get("/api/videos/top")
-async def get_top_videos(limit: int = 10, db: AsyncSession = Depends(get_db)):
-    videos = await video_repo.get_top_videos(db, limit=limit)
-    return {"videos": videos}
+@app.get("/api/videos/{video_id}/history", response_model=VideoHistoryResponse)
+async def get_video_history(
+    video_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_db),
+):
+    async def load():
+        history = await history_repo.get_history(db, video_id, start, end, limit)
+        return VideoHistoryResponse(video_id=video_id, history=history)
+
+    return await cached(
+        f"video_history:{video_id}:{start}:{end}:{limit}",
+        [f"video_history:{video_id}"],
+        load,
+    )
 
 
-@app.get("/api/users")
+@app.get("/api/users", response_model=UserPage)
 async def get_users(
-    limit: int = 20, offset: int = 0, db: AsyncSession = Depends(get_db)
+    limit: int = 20,
+    offset: int = 0,
+    sort: str = "id",
+    order: str = "asc",
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
 ):
-    users = await user_repo.get_all(db, limit=limit, offset=offset)
-    return {"users": users}
+    return await list_page(
+        "users", UserPage, user_repo, db, sort, order, limit, offset, cursor
+    )
+
 
+@app.get("/api/users/top", response_model=TopUsers)
+async def get_top_users(
+    metric: str = "follower_count", limit: int = 10, db: AsyncSession = Depends(get_db)
+):
+    try:
+        users = await leaderboards.top(db, "user", metric, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"metric": metric, "users": users}
 
-@app.get("/api/users/{sec_uid}")
+
+@app.get("/api/users/{sec_uid}", response_model=UserSchema)
 async def get_user(sec_uid: str, db: AsyncSession = Depends(get_db)):
-    user = await user_repo.get_by_sec_uid(db, sec_uid)
+    async def load():
+        user = await user_repo.get_by_sec_uid(db, sec_uid)
+        return UserSchema.model_validate(user) if user else None
+
+    user = await cached(f"user:{sec_uid}", [f"user:{sec_uid}"], load)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 
-@app.get("/api/tasks")
+@app.get("/api/users/{sec_uid}/history", response_model=UserHistoryResponse)
+async def get_user_history(
+    sec_uid: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_db),
+):
+    async def load():
+        history = await user_history_repo.get_history(db, sec_uid, start, end, limit)
+        return UserHistoryResponse(sec_uid=sec_uid, history=history)
+
+    return await cached(
+        f"user_history:{sec_uid}:{start}:{end}:{limit}",
+        [f"user_history:{sec_uid}"],
+        load,
+    )
+
+
+@app.get("/api/export/{table}")
+async def export_table(
+    table: str,
+    format: str = "ndjson",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    video_id: Optional[List[str]] = Query(None),
+    author_id: Optional[List[str]] = Query(None),
+    sec_uid: Optional[List[str]] = Query(None),
+):
+    """流式导出 videos / users / video_history / user_history (NDJSON或CSV)"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    try:
+        stmt = build_export_query(
+            table,
+            start,
+            end,
+            video_ids=parse_id_list(video_id),
+            author_ids=parse_id_list(author_id),
+            sec_uids=parse_id_list(sec_uid),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        stream_export(stmt, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{format}"'},
+    )
+
+
+@app.get("/api/tasks", response_model=TaskList)
 async def get_tasks(db: AsyncSession = Depends(get_db)):
     tasks = await task_repo.get_active_tasks(db)
-    return {"tasks": tasks}
+    return {
+        "tasks": tasks,
+        "effective_intervals": {
+            task.id: scheduler.get_effective_interval(task.id) for task in tasks
+        },
+    }
+
+
+@app.get("/api/tasks/{task_id}/interval")
+async def get_task_interval(task_id: int, db: AsyncSession = Depends(get_db)):
+    task = await task_repo.get_by_id(db, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    effective = scheduler.effective_intervals.get(task_id) or {}
+    return {
+        "task_id": task_id,
+        "interval": task.interval,
+        "effective_interval": scheduler.get_effective_interval(task_id),
+        "velocity": effective.get("velocity"),
+        "adaptive": scheduler.adaptive is not None,
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus 文本格式的运行指标 (多进程模式下含各分片上报的快照)"""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/api/crawler/stats")
+async def get_crawler_stats():
+    return {
+        "endpoints": crawler_manager.crawler.get_stats(),
+        "pending": crawl_engine.pending,
+        "singleflight": crawler_manager.crawler.singleflight_metrics(),
+        "writer": crawler_manager.writer.metrics()
+        if crawler_manager.writer is not None
+        else None,
+        "state_cache": crawler_manager.state_cache.metrics()
+        if crawler_manager.state_cache is not None
+        else None,
+        "leaderboards": leaderboards.metrics(),
+        "response_cache": response_cache.metrics()
+        if response_cache is not None
+        else None,
+    }
+
+
+@app.get("/api/workers")
+async def get_workers():
+    supervisor = getattr(app.state, "supervisor", None)
+    if supervisor is None:
+        return {"workers": 0, "scheduler": scheduler.stats}
+    return supervisor.metrics()
 
 
 @app.post("/api/crawl/video")
 async def crawl_video(video_id: str, db: AsyncSession = Depends(get_db)):
-    crawler = CrawlerManager()
-    success = await crawler.crawl_video(video_id)
+    success = await crawl_engine.submit_task("video", video_id)
     return {"success": success, "video_id": video_id}
 
 
 @app.post("/api/crawl/user")
 async def crawl_user(sec_uid: str, db: AsyncSession = Depends(get_db)):
-    crawler = CrawlerManager()
-    success = await crawler.crawl_user(sec_uid)
+    success = await crawl_engine.submit_task("user", sec_uid)
     return {"success": success, "sec_uid": sec_uid}
 
 
-@app.post("/api/tasks")
+class CrawlJobRequest(BaseModel):
+    """批量爬取请求: targets 为视频ID/sec_uid或分享链接"""
+
+    task_type: str = "video"
+    targets: List[str]
+
+
+@app.post("/api/jobs", status_code=202)
+async def create_crawl_job(request: CrawlJobRequest):
+    try:
+        job = job_manager.create(request.task_type, request.targets)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {**job.summary(), "status_url": f"/api/jobs/{job.id}"}
+
+
+@app.get("/api/jobs")
+async def list_crawl_jobs():
+    return {"jobs": [job.summary() for job in reversed(job_manager.jobs.values())]}
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_crawl_job(
+    job_id: str,
+    items: bool = False,
+    status: Optional[str] = None,
+    offset: int = 0,
+    limit: int = 100,
+):
+    """任务进度; items=true 时附带每个目标的状态 (可按 status 过滤, 分页)"""
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    result = job.summary()
+    if items or status:
+        selected = [
+            item for item in job.items if status is None or item["status"] == status
+        ]
+        result["items"] = selected[offset : offset + limit]
+    return result
+
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_crawl_job(job_id: str):
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job_id": job_id, "cancelled": job.cancel()}
+
+
+@app.post("/api/tasks", response_model=TaskResponse)
 async def create_task(
     task_type: str,
     target_id: str,
@@ -102,4 +397,54 @@ async def create_task(
     db: AsyncSession = Depends(get_db),
 ):
     task = await task_repo.create(db, task_type, target_id, name, interval)
+    scheduler.add_task(task)
+    return {"task": task}
+
+
+@app.post("/api/tasks/import")
+async def import_tasks(
+    request: Request,
+    format: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """批量导入任务 (JSON数组或CSV), 按 (task_type, target_id) 去重并更新名称/间隔"""
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if "csv" in content_type else "json"
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="format must be json or csv")
+    try:
+        tasks = parse_tasks(await request.body(), format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    result = await task_repo.upsert_tasks(db, tasks)
+    # 调度器增量拾取新增/变更的任务, 无需全量重载
+    result["scheduled"] = await scheduler.refresh()
+    return result
+
+
+@app.put("/api/tasks/{task_id}", response_model=TaskResponse)
+async def update_task(
+    task_id: int,
+    name: Optional[str] = None,
+    interval: Optional[int] = None,
+    enabled: Optional[bool] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    fields = {
+        key: value
+        for key, value in (("name", name), ("interval", interval), ("enabled", enabled))
+        if value is not None
+    }
+    task = await task_repo.update(db, task_id, **fields)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    scheduler.update_task(task)
     return {"task": task}
+
+
+@app.delete("/api/tasks/{task_id}")
+async def delete_task(task_id: int, db: AsyncSession = Depends(get_db)):
+    await task_repo.delete(db, task_id)
+    scheduler.remove_task(task_id)
+    return {"success": True, "task_id": task_id}
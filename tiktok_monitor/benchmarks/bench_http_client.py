@@ -0,0 +1,83 @@
+"""
+HTTP客户端基准测试 - 每请求新建会话 vs 共享连接池
+
+用法: python benchmarks/bench_http_client.py [请求数] [并发数]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.config import CrawlerConfig
+from core.crawler import TikTokCrawler
+
+
+async def _stub_handler(request):
+    return web.json_response({"item_info": {"id": request.query.get("item_id")}})
+
+
+async def _start_stub_server():
+    app = web.Application()
+    app.router.add_get("/api/item/detail/", _stub_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/api/item/detail/"
+
+
+async def _fetch_per_request_session(crawler: TikTokCrawler, url: str, params: dict):
+    """旧实现: 每次请求新建连接器和会话"""
+    connector = aiohttp.TCPConnector(ssl=False)
+    async with aiohttp.ClientSession(
+        connector=connector, headers=crawler.headers
+    ) as session:
+        async with session.get(url, params=params) as response:
+            return await response.json()
+
+
+async def _run(fetch, total: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            await fetch({"item_id": str(i)})
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return total / (time.perf_counter() - start)
+
+
+async def main(total: int, concurrency: int):
+    runner, url = await _start_stub_server()
+    # 只对比连接复用, 关闭按主机限速 (默认每秒1个请求)
+    crawler = TikTokCrawler(config=CrawlerConfig(request_interval=0))
+    try:
+        before = await _run(
+            lambda p: _fetch_per_request_session(crawler, url, p), total, concurrency
+        )
+        async with crawler:
+            after = await _run(
+                lambda p: crawler._make_request(url, p, need_sign=False),
+                total,
+                concurrency,
+            )
+    finally:
+        await runner.cleanup()
+
+    print(f"requests={total} concurrency={concurrency}")
+    print(f"per-request session: {before:10.1f} req/s")
+    print(f"pooled session:      {after:10.1f} req/s  ({after / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    asyncio.run(main(total, concurrency))
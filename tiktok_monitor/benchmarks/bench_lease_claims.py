@@ -0,0 +1,142 @@
+"""
+租约认领多进程验证 - 多个进程共享同一SQLite文件认领任务
+
+检查同一任务不会被两个进程同时持有, 并模拟崩溃进程的租约过期回收。
+
+用法: python benchmarks/bench_lease_claims.py [进程数] [任务数] [秒数]
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LEASE_SECONDS = 2
+WORK_SECONDS = 0.05
+
+
+def _setup(db_path: str) -> None:
+    sys.path.insert(0, PROJECT_ROOT)
+    config_path = os.path.join(os.path.dirname(db_path), "config.yaml")
+    with open(config_path, "w", encoding="utf-8") as f:
+        f.write(f'database:\n  path: "{db_path}"\n')
+    os.environ["TIKTOK_MONITOR_CONFIG"] = config_path
+
+
+async def _seed(db_path: str, count: int) -> None:
+    from storage.database import async_session_maker, init_db
+    from storage.models import MonitorTask
+
+    await init_db()
+    async with async_session_maker() as db:
+        db.add_all(
+            MonitorTask(task_type="video", target_id=str(i), interval=1)
+            for i in range(count)
+        )
+        await db.commit()
+
+
+async def _claim_loop(owner: str, seconds: float, crash: bool, results) -> None:
+    from datetime import datetime
+    from storage.database import async_session_maker
+    from storage.repositories import MonitorTaskRepository
+
+    repo = MonitorTaskRepository()
+    stop_at = time.time() + seconds
+    while time.time() < stop_at:
+        try:
+            async with async_session_maker() as db:
+                tasks = await repo.claim_due_tasks(db, owner, 10, LEASE_SECONDS)
+        except Exception:
+            results.put(("claim_error", owner, None, None, None))
+            await asyncio.sleep(0.01)
+            continue
+        if crash and tasks:
+            for task in tasks:
+                results.put(("crashed", owner, task.id, time.time(), None))
+            results.close()
+            results.join_thread()
+            os._exit(1)
+        for task in tasks:
+            start = time.time()
+            await asyncio.sleep(WORK_SECONDS)
+            results.put(("run", owner, task.id, start, time.time()))
+            async with async_session_maker() as db:
+                await repo.release_task(db, task.id, owner, True, datetime.utcnow())
+        if not tasks:
+            await asyncio.sleep(0.05)
+
+
+def _worker(db_path: str, owner: str, seconds: float, crash: bool, results) -> None:
+    _setup(db_path)
+    asyncio.run(_claim_loop(owner, seconds, crash, results))
+
+
+def main(processes: int, tasks: int, seconds: float) -> None:
+    tmp = tempfile.mkdtemp()
+    db_path = os.path.join(tmp, "lease.db")
+    _setup(db_path)
+    asyncio.run(_seed(db_path, tasks))
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    workers = [
+        ctx.Process(
+            target=_worker, args=(db_path, f"worker-{i}", seconds, i == 0, results)
+        )
+        for i in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+
+    events = []
+    deadline = time.time() + seconds + 30
+    while any(worker.is_alive() for worker in workers) or not results.empty():
+        try:
+            events.append(results.get(timeout=0.2))
+        except Exception:
+            pass
+        if time.time() > deadline:
+            break
+    for worker in workers:
+        worker.join()
+
+    runs = defaultdict(list)
+    crashed = {}
+    errors = 0
+    for kind, owner, task_id, start, end in events:
+        if kind == "run":
+            runs[task_id].append((start, end, owner))
+        elif kind == "crashed":
+            crashed[task_id] = start
+        else:
+            errors += 1
+
+    overlaps = 0
+    for intervals in runs.values():
+        intervals.sort()
+        for (s1, e1, o1), (s2, e2, o2) in zip(intervals, intervals[1:]):
+            if s2 < e1 and o1 != o2:
+                overlaps += 1
+
+    recovered = sum(
+        1
+        for task_id, crashed_at in crashed.items()
+        if any(start >= crashed_at + LEASE_SECONDS - 0.5 for start, _, _ in runs[task_id])
+    )  # fmt: skip
+    total_runs = sum(len(intervals) for intervals in runs.values())
+    print(f"processes={processes} tasks={tasks} duration={seconds}s")
+    print(f"runs: {total_runs} ({total_runs / seconds:.1f}/s), claim errors: {errors}")
+    print(f"overlapping claims: {overlaps}")
+    print(f"crashed leases recovered after expiry: {recovered}/{len(crashed)}")
+
+
+if __name__ == "__main__":
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    tasks = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 6
+    main(processes, tasks, seconds)
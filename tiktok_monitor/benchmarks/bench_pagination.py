@@ -0,0 +1,97 @@
+"""
+翻页流水线基准测试 - 逐页串行 vs 预取下一页与落库重叠
+
+模拟接口延迟, 落库走真实SQLite (直接写库, 不经后写队列)。
+
+用法: python benchmarks/bench_pagination.py [视频数] [接口延迟毫秒] [并发用户数]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGE_SIZE = 30
+
+
+def _setup() -> None:
+    tmp = tempfile.mkdtemp()
+    config_path = os.path.join(tmp, "config.yaml")
+    with open(config_path, "w", encoding="utf-8") as f:
+        f.write(
+            f'database:\n  path: "{os.path.join(tmp, "bench.db")}"\n'
+            "  write_behind: false\n"
+            "monitoring:\n  change_detection: false\n"
+        )
+    os.environ["TIKTOK_MONITOR_CONFIG"] = config_path
+    sys.path.insert(0, PROJECT_ROOT)
+
+
+def _fake_user_videos(videos: int, latency: float):
+    async def get_user_videos(sec_uid: str, count: int = 30, cursor: int = 0):
+        await asyncio.sleep(latency)
+        end = min(cursor + count, videos)
+        items = [
+            {
+                "id": f"{sec_uid}-{i}",
+                "create_time": videos - i,
+                "play_count": i,
+                "digg_count": i,
+            }
+            for i in range(cursor, end)
+        ]
+        return {"items": items, "cursor": end, "has_more": end < videos}
+
+    return get_user_videos
+
+
+async def _run(videos: int, latency: float, users: int, prefetch: int) -> float:
+    from core.config import settings
+    from core.crawler import CrawlerManager
+    from core.engine import CrawlEngine
+
+    settings.crawler.page_prefetch = prefetch
+    settings.crawler.concurrency = users
+    manager = CrawlerManager()
+    manager.crawler.get_user_videos = _fake_user_videos(videos, latency)
+    engine = CrawlEngine(manager)
+    await engine.start()
+    targets = [f"p{prefetch}-u{i}" for i in range(users)]
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(
+            engine.submit(manager.crawl_user_videos, target, videos)
+            for target in targets
+        )
+    )
+    elapsed = time.perf_counter() - start
+    await engine.stop()
+    assert all(result == videos for result in results), results
+    return elapsed
+
+
+async def main(videos: int, latency: float, users: int) -> None:
+    from storage.database import init_db
+
+    await init_db()
+    pages = -(-videos // PAGE_SIZE)
+    network = pages * latency
+    print(f"videos={videos} pages={pages} latency={latency * 1000:.0f}ms users={users}")
+    print(f"pure network time per user: {network:.3f}s")
+    for label, prefetch in (("serial", 0), ("pipelined", 1)):
+        elapsed = await _run(videos, latency, users, prefetch)
+        print(
+            f"{label:<10} {elapsed:7.3f}s  "
+            f"({elapsed / network:.2f}x network, "
+            f"{users * videos / elapsed:.0f} videos/s)"
+        )
+
+
+if __name__ == "__main__":
+    videos = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.05
+    users = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    _setup()
+    asyncio.run(main(videos, latency, users))
@@ -0,0 +1,107 @@
+"""
+接口序列化基准测试 - ORM对象+jsonable_encoder vs 结果行+响应模型直接输出JSON字节
+
+对比 /api/videos 列表的两条路径, 分别统计查询与序列化每1000行的耗时:
+- before: select(Video) 构造ORM对象, jsonable_encoder 逐行反射后 json.dumps
+- after:  只取列的结果行, 校验为 VideoPage 后由 pydantic-core 输出JSON字节
+
+用法: python benchmarks/bench_serialization.py [每页行数(<=500)] [轮数]
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _setup() -> None:
+    tmp = tempfile.mkdtemp()
+    config_path = os.path.join(tmp, "config.yaml")
+    with open(config_path, "w", encoding="utf-8") as f:
+        f.write(f'database:\n  path: "{os.path.join(tmp, "bench.db")}"\n')
+    os.environ["TIKTOK_MONITOR_CONFIG"] = config_path
+    sys.path.insert(0, PROJECT_ROOT)
+
+
+def _dumps(content) -> bytes:
+    # 与 JSONResponse.render 相同的参数
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+async def main(rows: int, rounds: int) -> None:
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from sqlalchemy import select
+
+    from api.schemas import VideoPage
+    from storage.database import async_session_maker, init_db
+    from storage.models import Video
+    from storage.repositories import MAX_PAGE_SIZE, VideoRepository
+
+    rows = min(rows, MAX_PAGE_SIZE)
+    await init_db()
+    repo = VideoRepository()
+    async with async_session_maker() as db:
+        await repo.bulk_upsert(
+            db,
+            [
+                {
+                    "video_id": f"v{i}",
+                    "desc": f"视频描述 #{i}",
+                    "create_time": 1700000000 + i,
+                    "play_count": i * 10,
+                    "digg_count": i,
+                    "author_id": f"a{i % 50}",
+                    "author_name": f"作者{i % 50}",
+                }
+                for i in range(rows)
+            ],
+        )
+    adapter = TypeAdapter(VideoPage)
+
+    async def before():
+        async with async_session_maker() as db:
+            start = time.perf_counter()
+            result = await db.execute(select(Video).order_by(Video.id).limit(rows))
+            videos = result.scalars().all()
+            fetched = time.perf_counter()
+            body = _dumps(jsonable_encoder({"videos": videos, "next_cursor": None}))
+            return fetched - start, time.perf_counter() - fetched, body
+
+    async def after():
+        async with async_session_maker() as db:
+            start = time.perf_counter()
+            videos, next_cursor = await repo.get_page(db, limit=rows)
+            fetched = time.perf_counter()
+            page = VideoPage.model_validate({"videos": videos, "next_cursor": None})
+            body = adapter.dump_json(page)
+            return fetched - start, time.perf_counter() - fetched, body
+
+    print(f"rows={rows} rounds={rounds} (ms per 1000 rows, best of rounds)")
+    results = {}
+    for label, run in (("before", before), ("after", after)):
+        await run()
+        timings = [await run() for _ in range(rounds)]
+        fetch = min(t[0] for t in timings) * 1000 * 1000 / rows
+        serialize = min(t[1] for t in timings) * 1000 * 1000 / rows
+        results[label] = (fetch, serialize, timings[-1][2])
+        print(
+            f"{label:<7} fetch {fetch:7.2f}ms  serialize {serialize:7.2f}ms  "
+            f"total {fetch + serialize:7.2f}ms"
+        )
+    assert json.loads(results["before"][2]) == json.loads(results["after"][2])
+    speedup = sum(results["before"][:2]) / sum(results["after"][:2])
+    print(f"speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    _setup()
+    asyncio.run(main(rows, rounds))
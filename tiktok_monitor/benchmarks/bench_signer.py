@@ -0,0 +1,37 @@
+"""
+X-Bogus签名基准测试 - 对比每秒签名数 (参考实现与黄金样例见 tests/)
+
+用法: python benchmarks/bench_signer.py [签名次数]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.signer import XBogusSigner
+from tests.signer_reference import ITEM_URL, ReferenceSigner
+
+
+def _rate(func, count: int) -> float:
+    start = time.perf_counter()
+    func()
+    return count / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    urls = [f"{ITEM_URL}{i}" for i in range(count)]
+
+    reference = ReferenceSigner()
+    signer = XBogusSigner()
+    results = [
+        ("reference get_xbogus", _rate(lambda: [reference.get_xbogus(u) for u in urls], count)),
+        ("get_xbogus", _rate(lambda: [signer.get_xbogus(u) for u in urls], count)),
+    ]  # fmt: skip
+
+    baseline = results[0][1]
+    print(f"urls={count}")
+    for name, rate in results:
+        print(f"{name:<22}{rate:12.1f} signs/s  ({rate / baseline:.2f}x)")
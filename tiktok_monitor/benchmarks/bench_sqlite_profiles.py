@@ -0,0 +1,90 @@
+"""
+SQLite性能档位基准测试 - 并发读写混合吞吐量
+
+用法: python benchmarks/bench_sqlite_profiles.py [秒数] [写协程数] [读协程数]
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from core.config import SQLITE_PROFILES, DatabaseConfig
+from storage.database import Base, create_engine
+from storage.models import Video
+from storage.repositories import VideoRepository
+
+PAGE_SIZE = 30
+VIDEO_IDS = 5000
+
+
+async def _writer(session_maker, stop_at: float, counters: dict) -> None:
+    repo = VideoRepository()
+    while time.perf_counter() < stop_at:
+        base = random.randrange(VIDEO_IDS)
+        rows = [
+            {"video_id": str((base + i) % VIDEO_IDS), "play_count": random.randrange(10**6)}
+            for i in range(PAGE_SIZE)
+        ]  # fmt: skip
+        try:
+            async with session_maker() as db:
+                await repo.bulk_upsert(db, rows)
+            counters["writes"] += len(rows)
+        except Exception:
+            counters["errors"] += 1
+
+
+async def _reader(session_maker, stop_at: float, counters: dict) -> None:
+    while time.perf_counter() < stop_at:
+        video_id = str(random.randrange(VIDEO_IDS))
+        try:
+            async with session_maker() as db:
+                await db.execute(select(Video).where(Video.video_id == video_id))
+            counters["reads"] += 1
+        except Exception:
+            counters["errors"] += 1
+
+
+async def run_profile(profile: str, seconds: float, writers: int, readers: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        config = DatabaseConfig(path=os.path.join(tmp, "bench.db"), profile=profile)
+        engine = create_engine(config)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_maker = async_sessionmaker(
+            engine, class_=AsyncSession, expire_on_commit=False
+        )
+        counters = {"writes": 0, "reads": 0, "errors": 0}
+        stop_at = time.perf_counter() + seconds
+        await asyncio.gather(
+            *(_writer(session_maker, stop_at, counters) for _ in range(writers)),
+            *(_reader(session_maker, stop_at, counters) for _ in range(readers)),
+        )
+        await engine.dispose()
+    return counters
+
+
+async def main(seconds: float, writers: int, readers: int):
+    print(f"duration={seconds}s writers={writers} readers={readers}")
+    for profile in SQLITE_PROFILES:
+        counters = await run_profile(profile, seconds, writers, readers)
+        print(
+            f"{profile:<12}"
+            f"writes {counters['writes'] / seconds:10.1f} rows/s  "
+            f"reads {counters['reads'] / seconds:10.1f} q/s  "
+            f"errors {counters['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    writers = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    readers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    asyncio.run(main(seconds, writers, readers))
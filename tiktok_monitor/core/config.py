@@ -10,17 +10,67 @@ import yaml
 from pydantic import BaseModel, Field
 
 
+SQLITE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "default": {},
+    "safe": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+    },
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 268435456,
+        "cache_size": -65536,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+}
+
+
 class DatabaseConfig(BaseModel):
     """数据库配置 - SQLite"""
 
     path: str = "data/tiktok_monitor.db"
     table_prefix: str = ""
+    profile: str = "performance"
+    journal_mode: Optional[str] = None
+    synchronous: Optional[str] = None
+    mmap_size: Optional[int] = None
+    cache_size: Optional[int] = None
+    temp_store: Optional[str] = None
+    busy_timeout: Optional[int] = None
+    write_behind: bool = True
+    write_queue_size: int = 10000
+    write_batch_size: int = 500
+    write_flush_interval: float = 1.0
+    write_retries: int = 3
+    write_retry_backoff: float = 0.2
 
     @property
     def url(self) -> str:
         """生成数据库URL"""
         return f"sqlite:///{self.path}"
 
+    @property
+    def pragmas(self) -> Dict[str, Any]:
+        """连接级PRAGMA: 性能档位默认值 + 显式覆盖项"""
+        if self.profile not in SQLITE_PROFILES:
+            raise ValueError(f"Unknown database profile: {self.profile}")
+        pragmas = dict(SQLITE_PROFILES[self.profile])
+        for name in (
+            "journal_mode",
+            "synchronous",
+            "mmap_size",
+            "cache_size",
+            "temp_store",
+            "busy_timeout",
+        ):
+            value = getattr(self, name)
+            if value is not None:
+                pragmas[name] = value
+        return pragmas
+
 
 class RedisConfig(BaseModel):
     """Redis配置"""
@@ -32,6 +82,23 @@ class RedisConfig(BaseModel):
     password: Optional[str] = None
 
 
+class CacheConfig(BaseModel):
+    """API读缓存配置"""
+
+    enabled: bool = True
+    ttl: float = 30.0
+    max_entries: int = 10000
+    key_prefix: str = "tiktok_monitor:"
+
+
+class LeaderboardConfig(BaseModel):
+    """排行榜配置"""
+
+    size: int = 100
+    rebuild_interval: float = 600.0
+    max_scoped_boards: int = 1000
+
+
 class AppConfig(BaseModel):
     """应用配置"""
 
@@ -60,15 +127,42 @@ class CrawlerConfig(BaseModel):
     max_retries: int = 3
     timeout: int = 30
     concurrency: int = 5
+    pool_size: int = 100
+    pool_size_per_host: int = 10
+    dns_cache_ttl: int = 300
+    keepalive_timeout: float = 30.0
+    retry_backoff: float = 0.5
+    retry_max_delay: float = 30.0
+    request_deadline: float = 90.0
+    breaker_failure_threshold: int = 5
+    breaker_recovery_timeout: float = 30.0
+    page_prefetch: int = 1
+    singleflight_ttl: float = 0.0
     tiktok: TikTokCrawlerConfig = Field(default_factory=TikTokCrawlerConfig)
 
 
+class AdaptiveConfig(BaseModel):
+    """自适应轮询配置"""
+
+    enabled: bool = False
+    min_interval: int = 60
+    max_interval: int = 6 * 3600
+    target_change: float = 0.01
+    history_window: int = 10
+    request_budget_per_minute: float = 0.0
+
+
 class MonitoringConfig(BaseModel):
     """监控配置"""
 
     enabled: bool = True
     default_interval: int = 300
     data_retention_days: int = 30
+    change_detection: bool = True
+    state_cache_size: int = 100000
+    user_videos_mode: str = "incremental"  # incremental | full
+    full_refresh_interval: int = 86400
+    adaptive: AdaptiveConfig = Field(default_factory=AdaptiveConfig)
 
 
 class SchedulerConfig(BaseModel):
@@ -76,6 +170,16 @@ class SchedulerConfig(BaseModel):
 
     enabled: bool = True
     timezone: str = "Asia/Shanghai"
+    jitter_ratio: float = 0.1
+    startup_spread: float = 60.0
+    mode: str = "local"
+    worker_id: Optional[str] = None
+    lease_seconds: int = 300
+    claim_batch_size: int = 100
+    claim_poll_interval: float = 5.0
+    refresh_interval: float = 30.0
+    workers: int = 0
+    worker_report_interval: float = 60.0
 
 
 class LoggingConfig(BaseModel):
@@ -94,6 +198,8 @@ class Config(BaseModel):
     proxy: str = ""
     database: DatabaseConfig = Field(default_factory=DatabaseConfig)
     redis: RedisConfig = Field(default_factory=RedisConfig)
+    cache: CacheConfig = Field(default_factory=CacheConfig)
+    leaderboard: LeaderboardConfig = Field(default_factory=LeaderboardConfig)
     app: AppConfig = Field(default_factory=AppConfig)
     crawler: CrawlerConfig = Field(default_factory=CrawlerConfig)
     monitoring: MonitoringConfig = Field(default_factory=MonitoringConfig)
@@ -3,18 +3,92 @@ TikTok 爬虫引擎
 """
 
 import asyncio
+import time
 import aiohttp
-from typing import Optional, Dict, Any, List
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Dict, List, Optional
 from urllib.parse import urlencode, urlparse
+from .config import CrawlerConfig, settings
+from .engine import HostRateLimiter
+from .metrics import gauge, histogram
+from .resilience import (
+    BLOCKED_STATUS,
+    RETRYABLE_STATUS,
+    CircuitBreaker,
+    RetryPolicy,
+    parse_retry_after,
+)
 from .signer import XBogusSigner
+from .singleflight import SingleFlight
 from .logger import logger
-from storage.repositories import VideoRepository, UserRepository
+from storage.database import async_session_maker
+from storage.repositories import (
+    CrawlLogRepository,
+    UserCrawlStateRepository,
+    UserHistoryRepository,
+    UserRepository,
+    VideoHistoryRepository,
+    VideoRepository,
+)
+from storage.state_cache import USER_METRICS, VIDEO_METRICS, LastStateCache
+from storage.writer import WriteListener, notify_listeners
+
+# 主页置顶视频可能早于水位, 首页允许出现这么多条已知视频而不停止翻页
+PINNED_VIDEO_LIMIT = 3
+
+
+@asynccontextmanager
+async def aclosing(agen: AsyncGenerator) -> AsyncIterator[AsyncGenerator]:
+    """退出时关闭异步生成器 (contextlib.aclosing 需要 Python 3.10)"""
+    try:
+        yield agen
+    finally:
+        await agen.aclose()
+
+
+def _watermark_stop(watermark: int) -> Callable[[List[dict]], bool]:
+    """增量翻页的停止条件: 页内已知视频(不晚于水位)超出置顶数量即已翻到水位"""
+    first_page = True
+
+    def reached(items: List[dict]) -> bool:
+        nonlocal first_page
+        known = sum(1 for item in items if (item.get("create_time") or 0) <= watermark)
+        limit = PINNED_VIDEO_LIMIT if first_page else 0
+        first_page = False
+        return known > limit
+
+    return reached
+
+
+REQUEST_SECONDS = histogram(
+    "tiktok_upstream_request_seconds",
+    "Upstream HTTP request latency per attempt (excluding rate limit wait)",
+    ("endpoint", "status"),
+)
+REQUESTS_IN_FLIGHT = gauge(
+    "tiktok_upstream_requests_in_flight", "Upstream HTTP requests in flight"
+).labels()
 
 
 class TikTokCrawler:
-    def __init__(self, cookie: str = None, proxy: str = None):
+    def __init__(
+        self, cookie: str = None, proxy: str = None, config: CrawlerConfig = None
+    ):
         self.cookie = cookie or ""
-        self.proxy = proxy
+        self.proxy = proxy or None
+        self.config = config or settings.crawler
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.rate_limiter = HostRateLimiter(self.config.request_interval)
+        self.retry_policy = RetryPolicy(
+            self.config.max_retries,
+            self.config.retry_backoff,
+            self.config.retry_max_delay,
+        )
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.request_stats: Dict[str, Dict[str, int]] = {}
+        self.video_flight = SingleFlight(self.config.singleflight_ttl)
+        self.user_flight = SingleFlight(self.config.singleflight_ttl)
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/131.0.0.0 Safari/537.36",
             "Accept": "application/json",
@@ -25,10 +99,44 @@ class TikTokCrawler:
             self.headers["Cookie"] = self.cookie
         self.signer = XBogusSigner(self.headers["User-Agent"])
 
+    async def start(self) -> None:
+        """创建共享连接池"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                ssl=False,
+                limit=self.config.pool_size,
+                limit_per_host=self.config.pool_size_per_host,
+                ttl_dns_cache=self.config.dns_cache_ttl,
+                keepalive_timeout=self.config.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.config.timeout),
+            )
+
+    async def close(self) -> None:
+        """关闭共享连接池"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
     async def _make_request(
         self, url: str, params: Dict = None, need_sign: bool = True
     ) -> Optional[Dict[str, Any]]:
-        """发起HTTP请求"""
+        """发起HTTP请求 (可重试错误按退避策略重试, 受截止时间和熔断器约束)"""
         try:
             if need_sign and "web.tiktok.com" in url:
                 if params:
@@ -38,28 +146,154 @@ class TikTokCrawler:
                 parsed = urlparse(signed_url)
                 url = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
                 params = dict(parsed.query)
+        except Exception as e:
+            logger.error(f"Request sign error: {e}")
+            return None
 
-            connector = aiohttp.TCPConnector(ssl=False)
-            async with aiohttp.ClientSession(
-                connector=connector,
-                headers=self.headers,
-            ) as session:
+        parsed_url = urlparse(url)
+        endpoint = parsed_url.path
+        breaker = self._get_breaker(endpoint)
+        stats = self._get_stats(endpoint)
+        stats["requests"] += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.config.request_deadline
+
+        for attempt in range(self.retry_policy.max_retries + 1):
+            if not breaker.allow():
+                stats["short_circuited"] += 1
+                logger.warning(f"Circuit open, skipping request: {url}")
+                return None
+
+            retry_after = None
+            started = None
+            status = "error"
+            settled = False
+            try:
+                session = await self._get_session()
+                await self.rate_limiter.acquire(parsed_url.netloc)
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                timeout = aiohttp.ClientTimeout(
+                    total=min(self.config.timeout, remaining)
+                )
+                started = time.perf_counter()
+                REQUESTS_IN_FLIGHT.inc()
                 async with session.get(
-                    url, params=params, proxy=self.proxy
+                    url, params=params, proxy=self.proxy, timeout=timeout
                 ) as response:
+                    status = str(response.status)
                     if response.status == 200:
-                        return await response.json()
-                    else:
+                        data = await response.json(content_type=None)
+                        breaker.record_success()
+                        settled = True
+                        return data
+                    if response.status not in RETRYABLE_STATUS:
+                        # 其余客户端错误(如404)说明不了端点是否健康, 由 finally 归还名额
+                        if response.status in BLOCKED_STATUS:
+                            breaker.record_failure()
+                            settled = True
+                        stats["failures"] += 1
                         logger.warning(
                             f"Request failed with status {response.status}: {url}"
                         )
                         return None
-        except Exception as e:
-            logger.error(f"Request error: {e}")
-            return None
+                    breaker.record_failure()
+                    settled = True
+                    retry_after = parse_retry_after(
+                        response.headers.get("Retry-After")
+                    )
+                    logger.warning(
+                        f"Request failed with status {response.status} "
+                        f"(attempt {attempt + 1}): {url}"
+                    )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    status = "timeout"
+                breaker.record_failure()
+                settled = True
+                logger.warning(
+                    f"Request error (attempt {attempt + 1}): {e!r} {url}"
+                )
+            except Exception as e:
+                # 已发出的请求(如响应体不是合法JSON)计为失败
+                if started is not None:
+                    breaker.record_failure()
+                    settled = True
+                stats["failures"] += 1
+                logger.error(f"Request error: {e}")
+                return None
+            finally:
+                if not settled:
+                    breaker.release()
+                if started is not None:
+                    REQUESTS_IN_FLIGHT.dec()
+                    REQUEST_SECONDS.labels(endpoint, status).observe(
+                        time.perf_counter() - started
+                    )
+
+            if attempt >= self.retry_policy.max_retries:
+                break
+            delay = self.retry_policy.delay(attempt, retry_after)
+            if loop.time() + delay >= deadline:
+                break
+            stats["retries"] += 1
+            await asyncio.sleep(delay)
+
+        stats["failures"] += 1
+        logger.error(f"Request gave up after {attempt + 1} attempts: {url}")
+        return None
+
+    def _get_breaker(self, endpoint: str) -> CircuitBreaker:
+        breaker = self.breakers.get(endpoint)
+        if breaker is None:
+            breaker = self.breakers[endpoint] = CircuitBreaker(
+                self.config.breaker_failure_threshold,
+                self.config.breaker_recovery_timeout,
+            )
+        return breaker
+
+    def _get_stats(self, endpoint: str) -> Dict[str, int]:
+        stats = self.request_stats.get(endpoint)
+        if stats is None:
+            stats = self.request_stats[endpoint] = {
+                "requests": 0,
+                "retries": 0,
+                "failures": 0,
+                "short_circuited": 0,
+            }
+        return stats
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """按接口返回熔断器状态和重试计数"""
+        endpoints = set(self.request_stats) | set(self.breakers)
+        return {
+            endpoint: {
+                **self._get_stats(endpoint),
+                "breaker": self._get_breaker(endpoint).snapshot(),
+            }
+            for endpoint in sorted(endpoints)
+        }
+
+    def singleflight_metrics(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            "video": self.video_flight.metrics(),
+            "user": self.user_flight.metrics(),
+        }
 
     async def get_video_info(self, video_id: str) -> Optional[Dict[str, Any]]:
-        """获取视频详情"""
+        """获取视频详情 (同一视频的并发请求合并为一次)"""
+        return await self.video_flight.do(
+            video_id, lambda: self._fetch_video_info(video_id)
+        )
+
+    async def get_user_info(self, sec_uid: str) -> Optional[Dict[str, Any]]:
+        """获取用户信息 (同一用户的并发请求合并为一次)"""
+        return await self.user_flight.do(
+            sec_uid, lambda: self._fetch_user_info(sec_uid)
+        )
+
+    async def _fetch_video_info(self, video_id: str) -> Optional[Dict[str, Any]]:
         url = "https://www.tiktok.com/api/item/detail/"
         params = {"item_id": video_id}
         data = await self._make_request(url, params)
@@ -67,8 +301,7 @@ class TikTokCrawler:
             return data["item_info"]
         return None
 
-    async def get_user_info(self, sec_uid: str) -> Optional[Dict[str, Any]]:
-        """获取用户信息"""
+    async def _fetch_user_info(self, sec_uid: str) -> Optional[Dict[str, Any]]:
         url = "https://www.tiktok.com/api/user/detail/"
         params = {"sec_user_id": sec_uid}
         data = await self._make_request(url, params)
@@ -88,14 +321,75 @@ class TikTokCrawler:
         }
         return await self._make_request(url, params)
 
+    async def iter_user_videos(
+        self,
+        sec_uid: str,
+        cursor: int = 0,
+        max_videos: Optional[int] = None,
+        stop_when: Optional[Callable[[List[dict]], bool]] = None,
+        prefetch: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """逐页产出用户视频列表
+
+        后台最多预取 prefetch 页, 使下一页请求与调用方处理(落库)当前页重叠。
+        是否继续翻页由这里判断 (max_videos / stop_when), 预取不会多发请求。
+        """
+        prefetch = self.config.page_prefetch if prefetch is None else prefetch
+
+        async def fetch_pages():
+            nonlocal cursor
+            fetched = 0
+            while max_videos is None or fetched < max_videos:
+                result = await self.get_user_videos(sec_uid, count=30, cursor=cursor)
+                if not result or "items" not in result:
+                    return
+                yield result
+                fetched += len(result["items"])
+                if stop_when is not None and stop_when(result["items"]):
+                    return
+                if "cursor" not in result or not result.get("has_more", False):
+                    return
+                cursor = result["cursor"]
+
+        if prefetch <= 0:
+            async with aclosing(fetch_pages()) as pages:
+                async for result in pages:
+                    yield result
+            return
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=prefetch)
+
+        async def produce():
+            try:
+                async for result in fetch_pages():
+                    await queue.put((result, None))
+                await queue.put((None, None))
+            except Exception as e:
+                await queue.put((None, e))
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                result, error = await queue.get()
+                if error is not None:
+                    raise error
+                if result is None:
+                    return
+                yield result
+        finally:
+            # 等待预取任务真正结束, 避免其在途请求比生成器活得更久
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
     async def extract_video_id(self, share_url: str) -> Optional[str]:
         """从分享链接提取视频ID"""
         if "vt.tiktok.com" in share_url or "vm.tiktok.com" in share_url:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    share_url, allow_redirects=True, proxy=self.proxy
-                ) as response:
-                    share_url = str(response.url)
+            session = await self._get_session()
+            await self.rate_limiter.acquire(urlparse(share_url).netloc)
+            async with session.get(
+                share_url, allow_redirects=True, proxy=self.proxy
+            ) as response:
+                share_url = str(response.url)
         if "/video/" in share_url:
             parts = share_url.split("/video/")
             if len(parts) > 1:
@@ -127,16 +421,130 @@ class TikTokCrawler:
 
 
 class CrawlerManager:
-    def __init__(self, cookie: str = None, proxy: str = None):
-        self.crawler = TikTokCrawler(cookie, proxy)
+    def __init__(
+        self,
+        cookie: str = None,
+        proxy: str = None,
+        config: CrawlerConfig = None,
+        writer=None,
+        state_cache: Optional[LastStateCache] = None,
+    ):
+        self.crawler = TikTokCrawler(cookie, proxy, config)
+        self.writer = writer
+        self.state_cache = state_cache
         self.video_repo = VideoRepository()
         self.user_repo = UserRepository()
+        self.history_repo = VideoHistoryRepository()
+        self.user_history_repo = UserHistoryRepository()
+        self.log_repo = CrawlLogRepository()
+        self.crawl_state_repo = UserCrawlStateRepository()
+        self.write_listeners: List[WriteListener] = []
+        if state_cache is not None:
+            self.add_write_listener(state_cache.on_write)
+
+    async def start(self) -> None:
+        """启动爬虫(建立连接池, 启动后写队列)"""
+        await self.crawler.start()
+        if self.writer is not None:
+            await self.writer.start()
+        if self.state_cache is not None and not len(self.state_cache):
+            async with async_session_maker() as db:
+                loaded = await self.state_cache.warm(db)
+            logger.info(f"State cache warmed with {loaded} entries")
+
+    async def close(self) -> None:
+        """关闭爬虫(释放连接池, 落库后写队列)"""
+        await self.crawler.close()
+        if self.writer is not None:
+            await self.writer.stop()
+
+    def add_write_listener(self, listener: WriteListener) -> None:
+        """注册数据提交后的回调 (如缓存失效)"""
+        self.write_listeners.append(listener)
+        if self.writer is not None:
+            self.writer.listeners.append(listener)
+
+    async def _persist(self, kind: str, rows: List[dict]) -> None:
+        """写入数据: 有后写队列时入队, 否则直接批量写库"""
+        if not rows:
+            return
+        if self.writer is not None and self.writer.running:
+            await self.writer.put_many(kind, rows)
+            return
+        async with async_session_maker() as db:
+            if kind == "video":
+                await self.video_repo.bulk_upsert(db, rows)
+            elif kind == "user":
+                await self.user_repo.bulk_upsert(db, rows)
+            elif kind == "video_history":
+                await self.history_repo.add_many(db, rows)
+            elif kind == "user_history":
+                await self.user_history_repo.add_many(db, rows)
+            elif kind == "crawl_log":
+                await self.log_repo.add_many(db, rows)
+        await notify_listeners(self.write_listeners, {kind: rows})
+
+    async def _save_videos(self, rows: List[dict]) -> None:
+        """写入视频数据并记录历史快照, 计数未变化的行跳过"""
+        if self.state_cache is not None:
+            rows = self.state_cache.filter_changed("video", "video_id", rows)
+        if not rows:
+            return
+        now = datetime.utcnow()
+        await self._persist("video", rows)
+        await self._persist(
+            "video_history",
+            [
+                {
+                    "video_id": row["video_id"],
+                    **{key: row.get(key, 0) for key in VIDEO_METRICS},
+                    "crawled_at": now,
+                }
+                for row in rows
+            ],
+        )
+
+    async def _save_users(self, rows: List[dict]) -> None:
+        """写入用户数据并记录粉丝等历史快照, 计数未变化的行跳过"""
+        if self.state_cache is not None:
+            rows = self.state_cache.filter_changed("user", "sec_uid", rows)
+        if not rows:
+            return
+        now = datetime.utcnow()
+        await self._persist("user", rows)
+        await self._persist(
+            "user_history",
+            [
+                {
+                    "sec_uid": row["sec_uid"],
+                    **{key: row.get(key, 0) for key in USER_METRICS},
+                    "crawled_at": now,
+                }
+                for row in rows
+            ],
+        )
+
+    async def _log(
+        self, target_type: str, target_id: str, status: str, message: str = ""
+    ) -> None:
+        await self._persist(
+            "crawl_log",
+            [
+                {
+                    "target_type": target_type,
+                    "target_id": target_id,
+                    "status": status,
+                    "message": message,
+                }
+            ],
+        )
 
     async def crawl_video(self, video_id: str) -> bool:
         """爬取单个视频数据"""
         video_info = await self.crawler.get_video_info(video_id)
         if not video_info:
             logger.error(f"Failed to get video info: {video_id}")
+            await self._log("video", video_id, "failed", "video info unavailable")
             return False
 
         data = {
@@ -152,7 +560,8 @@ class CrawlerManager:
             "author_name": video_info.get("author", ""),
         }
 
-        await self.video_repo.create_or_update(video_id, data)
+        await self._save_videos([data])
+        await self._log("video", video_id, "success")
         logger.info(f"Crawled video: {video_id}")
         return True
 
@@ -161,6 +570,7 @@ class CrawlerManager:
         user_info = await self.crawler.get_user_info(sec_uid)
         if not user_info:
             logger.error(f"Failed to get user info: {sec_uid}")
+            await self._log("user", sec_uid, "failed", "user info unavailable")
             return False
 
         data = {
@@ -173,45 +583,94 @@ class CrawlerManager:
             "video_count": user_info.get("video_count", 0),
         }
 
-        await self.user_repo.create_or_update(sec_uid, data)
+        await self._save_users([data])
+        await self._log("user", sec_uid, "success")
         logger.info(f"Crawled user: {sec_uid}")
         return True
 
-    async def crawl_user_videos(self, sec_uid: str, max_videos: int = 100) -> int:
-        """爬取用户所有视频数据"""
-        cursor = 0
+    async def crawl_user_videos(
+        self, sec_uid: str, max_videos: int = 100, mode: Optional[str] = None
+    ) -> int:
+        """爬取用户视频列表
+
+        incremental: 翻到水位(上次见过的最新视频)以下即停止;
+        full: 完整遍历刷新旧视频计数, 未遍历完时记录游标下次续爬。
+        没有水位的首次爬取按 full 处理。
+        """
+        mode = mode or settings.monitoring.user_videos_mode
+        async with async_session_maker() as db:
+            state = await self.crawl_state_repo.get_by_sec_uid(db, sec_uid)
+        watermark = state.newest_create_time if state is not None else None
+        full = mode == "full" or watermark is None
+        cursor = (state.last_cursor or 0) if full and state is not None else 0
+        newest_time = watermark or 0
+        newest_id = state.newest_video_id if state is not None else None
         total_crawled = 0
+        pages = 0
+        last_page = None
 
-        while total_crawled < max_videos:
-            result = await self.crawler.get_user_videos(
-                sec_uid, count=30, cursor=cursor
-            )
-            if not result or "items" not in result:
-                break
+        stop_when: Optional[Callable[[List[dict]], bool]] = None
+        if not full:
+            stop_when = _watermark_stop(watermark)
 
-            for item in result["items"]:
-                video_id = item.get("id")
-                if video_id:
-                    data = {
-                        "video_id": video_id,
-                        "desc": item.get("desc", ""),
-                        "create_time": item.get("create_time", 0),
-                        "digg_count": item.get("digg_count", 0),
-                        "share_count": item.get("share_count", 0),
-                        "comment_count": item.get("comment_count", 0),
-                        "play_count": item.get("play_count", 0),
-                        "collect_count": item.get("collect_count", 0),
-                        "author_id": item.get("author_id", ""),
-                    }
-                    await self.video_repo.create_or_update(video_id, data)
-                    total_crawled += 1
-
-            if "cursor" in result:
-                cursor = result["cursor"]
-                if not result.get("has_more", False):
-                    break
+        pages_iter = self.crawler.iter_user_videos(
+            sec_uid, cursor=cursor, max_videos=max_videos, stop_when=stop_when
+        )
+        async with aclosing(pages_iter) as results:
+            async for result in results:
+                pages += 1
+                last_page = result
+                rows = []
+                for item in result["items"]:
+                    video_id = item.get("id")
+                    if video_id:
+                        rows.append(
+                            {
+                                "video_id": video_id,
+                                "desc": item.get("desc", ""),
+                                "create_time": item.get("create_time", 0),
+                                "digg_count": item.get("digg_count", 0),
+                                "share_count": item.get("share_count", 0),
+                                "comment_count": item.get("comment_count", 0),
+                                "play_count": item.get("play_count", 0),
+                                "collect_count": item.get("collect_count", 0),
+                                "author_id": item.get("author_id", ""),
+                            }
+                        )
+                await self._save_videos(rows)
+                total_crawled += len(rows)
+                for row in rows:
+                    if (row["create_time"] or 0) > newest_time:
+                        newest_time, newest_id = row["create_time"], row["video_id"]
+
+        completed = False
+        if last_page is not None:
+            if "cursor" in last_page and last_page.get("has_more", False):
+                cursor = last_page["cursor"]
             else:
-                break
+                completed = True
+
+        fields = {
+            "newest_create_time": newest_time or None,
+            "newest_video_id": newest_id,
+        }
+        if full:
+            fields["last_cursor"] = 0 if completed else cursor
+            if completed:
+                fields["last_full_refresh"] = datetime.utcnow()
+        async with async_session_maker() as db:
+            await self.crawl_state_repo.save(db, sec_uid, **fields)
 
-        logger.info(f"Crawled {total_crawled} videos for user: {sec_uid}")
+        summary = f"{total_crawled} videos, {pages} pages"
+        await self._log(
+            "user_videos",
+            sec_uid,
+            "success",
+            f"{summary} ({'full' if full else 'incremental'})",
+        )
+        logger.info(f"Crawled {summary} for user: {sec_uid}")
         return total_crawled
+
+    async def refresh_user_videos(self, sec_uid: str, max_videos: int = 100) -> int:
+        """完整刷新用户视频计数 (后台低优先级执行)"""
+        return await self.crawl_user_videos(sec_uid, max_videos, mode="full")
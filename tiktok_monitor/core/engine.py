@@ -0,0 +1,197 @@
+"""
+爬取引擎 - 有界工作池 + 按主机令牌桶限速
+"""
+
+import asyncio
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .config import CrawlerConfig, settings
+from .logger import logger
+from .metrics import counter, gauge, histogram
+
+
+TASK_HANDLERS = {
+    "video": "crawl_video",
+    "user": "crawl_user",
+    "user_videos": "crawl_user_videos",
+    "user_videos_full": "refresh_user_videos",
+}
+
+# 数值越小越先执行
+PRIORITY_NORMAL = 0
+PRIORITY_BULK = 5
+PRIORITY_BACKGROUND = 10
+
+CRAWL_TASKS = counter(
+    "tiktok_crawl_tasks_total",
+    "Crawl tasks by task type and outcome (success / failed / error)",
+    ("task_type", "outcome"),
+)
+QUEUE_WAIT_SECONDS = histogram(
+    "tiktok_engine_queue_wait_seconds",
+    "Time from submit until a crawl worker starts the task",
+    ("priority",),
+)
+ENGINE_PENDING = gauge(
+    "tiktok_engine_pending", "Crawl tasks waiting in the engine queue"
+).labels()
+
+
+def record_outcome(task_type: str, future: "asyncio.Future[Any]") -> None:
+    """按结果记录爬取结果计数: 异常为 error, 返回 False/None 为 failed"""
+    if future.cancelled():
+        return
+    if future.exception() is not None:
+        outcome = "error"
+    elif future.result() is False or future.result() is None:
+        outcome = "failed"
+    else:
+        outcome = "success"
+    CRAWL_TASKS.labels(task_type, outcome).inc()
+
+
+class TokenBucket:
+    """令牌桶限速器"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    async def acquire(self) -> None:
+        """获取一个令牌, 不足时等待"""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+class HostRateLimiter:
+    """按主机划分的令牌桶集合"""
+
+    def __init__(self, request_interval: float, burst: float = 1.0):
+        self.rate = 1.0 / request_interval if request_interval > 0 else 0.0
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    async def acquire(self, host: str) -> None:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+        await bucket.acquire()
+
+
+class CrawlEngine:
+    """有界并发的爬取引擎, 调度器和API共用"""
+
+    def __init__(self, manager, config: CrawlerConfig = None):
+        self.manager = manager
+        self.config = config or settings.crawler
+        self.concurrency = max(1, self.config.concurrency)
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._sequence = itertools.count()
+        self._workers: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self) -> None:
+        """启动工作协程"""
+        if self.running:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._workers = [
+            asyncio.create_task(self._worker(i)) for i in range(self.concurrency)
+        ]
+        await self.manager.start()
+        logger.info(f"Crawl engine started with {self.concurrency} workers")
+
+    async def stop(self) -> None:
+        """停止工作协程, 取消未执行的任务"""
+        if not self.running:
+            return
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        while not self._queue.empty():
+            *_, future = self._queue.get_nowait()
+            if not future.done():
+                future.cancel()
+        ENGINE_PENDING.set(0)
+        await self.manager.close()
+        logger.info("Crawl engine stopped")
+
+    def submit(
+        self,
+        func: Callable[..., Awaitable[Any]],
+        *args: Any,
+        priority: int = PRIORITY_NORMAL,
+    ) -> "asyncio.Future[Any]":
+        """提交任务, 返回结果Future; 同优先级按提交顺序执行"""
+        if not self.running:
+            raise RuntimeError("Crawl engine is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(
+            (priority, next(self._sequence), time.perf_counter(), func, args, future)
+        )
+        ENGINE_PENDING.set(self._queue.qsize())
+        return future
+
+    def submit_task(
+        self, task_type: str, target_id: str, priority: int = PRIORITY_NORMAL
+    ) -> "asyncio.Future[Any]":
+        """按监控任务类型提交"""
+        if task_type not in TASK_HANDLERS:
+            raise ValueError(f"Unknown task type: {task_type}")
+        future = self.submit(
+            getattr(self.manager, TASK_HANDLERS[task_type]),
+            target_id,
+            priority=priority,
+        )
+        future.add_done_callback(lambda done: record_outcome(task_type, done))
+        return future
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            priority, _, enqueued_at, func, args, future = await self._queue.get()
+            ENGINE_PENDING.set(self._queue.qsize())
+            try:
+                if future.cancelled():
+                    continue
+                QUEUE_WAIT_SECONDS.labels(str(priority)).observe(
+                    time.perf_counter() - enqueued_at
+                )
+                result = await func(*args)
+                if not future.done():
+                    future.set_result(result)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as e:
+                logger.error(f"Crawl worker {index} error: {e}")
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,167 @@
+"""
+批量爬取任务 - 一次提交大量目标, 在共享爬取引擎上扇出执行并跟踪进度
+"""
+
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .engine import CRAWL_TASKS, PRIORITY_BULK, TASK_HANDLERS
+from .logger import logger
+
+MAX_JOB_ITEMS = 10000
+MAX_JOBS = 100
+JOB_TASK_TYPES = ("video", "user", "user_videos")
+
+
+class CrawlJob:
+    """一个批量任务及其每个目标的状态"""
+
+    def __init__(self, task_type: str, targets: List[str]):
+        self.id = uuid.uuid4().hex
+        self.task_type = task_type
+        self.items: List[Dict[str, Any]] = [
+            {"target": target, "status": "pending"} for target in targets
+        ]
+        self.counts = {
+            "pending": len(targets),
+            "running": 0,
+            "success": 0,
+            "failed": 0,
+            "error": 0,
+            "cancelled": 0,
+        }
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self.futures: List["asyncio.Future[Any]"] = []
+        self._started = time.monotonic()
+        self._elapsed: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.counts["pending"] == 0 and self.counts["running"] == 0
+
+    def set_status(self, index: int, status: str, **fields: Any) -> None:
+        item = self.items[index]
+        self.counts[item["status"]] -= 1
+        self.counts[status] += 1
+        item["status"] = status
+        item.update(fields)
+        if self.done and self.finished_at is None:
+            self.finished_at = datetime.utcnow()
+            self._elapsed = time.monotonic() - self._started
+
+    def cancel(self) -> int:
+        """取消尚未开始的目标, 已在执行的目标会正常完成"""
+        cancelled = 0
+        for item, future in zip(self.items, self.futures):
+            # 执行中目标的 Future 也能被取消, 但协程仍会跑完, 不应计入
+            if item["status"] == "pending" and future.cancel():
+                cancelled += 1
+        return cancelled
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = self._elapsed
+        if elapsed is None:
+            elapsed = time.monotonic() - self._started
+        total = len(self.items)
+        completed = total - self.counts["pending"] - self.counts["running"]
+        throughput = completed / elapsed if elapsed > 0 else 0.0
+        remaining = total - completed
+        return {
+            "job_id": self.id,
+            "task_type": self.task_type,
+            "status": "finished" if self.done else "running",
+            "total": total,
+            "completed": completed,
+            "progress": completed / total if total else 1.0,
+            "counts": dict(self.counts),
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "elapsed": elapsed,
+            "throughput_per_second": throughput,
+            "eta_seconds": remaining / throughput if throughput > 0 else None,
+        }
+
+
+class CrawlJobManager:
+    """在共享爬取引擎上运行批量任务, 保留最近 MAX_JOBS 个任务的状态"""
+
+    def __init__(self, engine, max_jobs: int = MAX_JOBS):
+        self.engine = engine
+        self.max_jobs = max_jobs
+        self.jobs: "OrderedDict[str, CrawlJob]" = OrderedDict()
+
+    def create(self, task_type: str, targets: List[str]) -> CrawlJob:
+        """创建并立即提交任务; 目标可以是ID或分享链接, 重复目标只爬一次"""
+        if task_type not in JOB_TASK_TYPES:
+            raise ValueError(f"Unsupported job type: {task_type}")
+        targets = list(dict.fromkeys(t.strip() for t in targets if t and t.strip()))
+        if not targets:
+            raise ValueError("No targets given")
+        if len(targets) > MAX_JOB_ITEMS:
+            raise ValueError(f"At most {MAX_JOB_ITEMS} targets per job")
+
+        job = CrawlJob(task_type, targets)
+        for index in range(len(targets)):
+            future = self.engine.submit(
+                self._run_item, job, index, priority=PRIORITY_BULK
+            )
+            future.add_done_callback(
+                lambda done, index=index: self._on_done(job, index, done)
+            )
+            job.futures.append(future)
+        self.jobs[job.id] = job
+        self._evict()
+        logger.info(
+            f"Crawl job {job.id} created with {len(targets)} {task_type} targets"
+        )
+        return job
+
+    def get(self, job_id: str) -> Optional[CrawlJob]:
+        return self.jobs.get(job_id)
+
+    def _evict(self) -> None:
+        """超出数量时丢弃最早的已完成任务"""
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                return
+            if self.jobs[job_id].done:
+                del self.jobs[job_id]
+
+    async def _resolve(self, job: CrawlJob, target: str) -> Optional[str]:
+        if not target.startswith(("http://", "https://")):
+            return target
+        crawler = self.engine.manager.crawler
+        if job.task_type == "video":
+            return await crawler.extract_video_id(target)
+        return await crawler.extract_sec_uid(target)
+
+    async def _run_item(self, job: CrawlJob, index: int) -> None:
+        job.set_status(index, "running")
+        try:
+            target_id = await self._resolve(job, job.items[index]["target"])
+            if not target_id:
+                job.set_status(index, "failed", error="unresolvable share url")
+                return
+            handler = getattr(self.engine.manager, TASK_HANDLERS[job.task_type])
+            result = await handler(target_id)
+        except asyncio.CancelledError:
+            job.set_status(index, "cancelled")
+            raise
+        except Exception as e:
+            job.set_status(index, "error", error=str(e))
+            CRAWL_TASKS.labels(job.task_type, "error").inc()
+            return
+        # user_videos 返回爬取条数, 其余返回是否成功
+        status = "failed" if result is False or result is None else "success"
+        job.set_status(index, status, target_id=target_id, result=result)
+        CRAWL_TASKS.labels(job.task_type, status).inc()
+
+    def _on_done(self, job: CrawlJob, index: int, future: "asyncio.Future") -> None:
+        # 在开始执行前被取消的目标不会进入 _run_item
+        if future.cancelled() and job.items[index]["status"] == "pending":
+            job.set_status(index, "cancelled")
@@ -0,0 +1,286 @@
+"""
+运行指标 - 轻量的 Counter / Gauge / Histogram, 以 Prometheus 文本格式输出
+
+热路径上只有一次字典查找和几次整数/浮点运算, 可在生产环境常开。
+带标签的指标先 labels(...) 取子项再记录, 子项按标签值缓存。
+多进程模式下工作进程定期上报快照, 由主进程附加 shard 标签一并输出。
+"""
+
+import copy
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 秒, 覆盖签名(亚毫秒)到上游请求(数秒)的范围
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _escape_help(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    @abstractmethod
+    def _new_child(self):
+        """创建一个标签组合对应的子项"""
+
+    def labels(self, *values: str):
+        """按标签值(与 labelnames 同序)取子项"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(
+                    f"{self.name} expects labels {self.labelnames}, got {values}"
+                )
+            child = self._children[values] = self._new_child()
+        return child
+
+    def clear(self) -> None:
+        self._children.clear()
+
+    def _samples(
+        self, names: Tuple[str, ...], values: Tuple[str, ...], child
+    ) -> Iterator[Tuple[str, str, float]]:
+        yield "", _format_labels(names, values), child.value
+
+    def render(self, remote: Sequence[Tuple[str, Dict[Tuple[str, ...], Any]]] = ()):
+        """输出本进程的样本, 以及各 (shard, 子项快照) 带 shard 标签的样本"""
+        lines = [
+            f"# HELP {self.name} {_escape_help(self.documentation)}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        sources = [((), (), self._children)]
+        sources.extend((("shard",), (shard,), children) for shard, children in remote)
+        for extra_names, extra_values, children in sources:
+            names = extra_names + self.labelnames
+            for values, child in sorted(children.items()):
+                for suffix, labels, value in self._samples(
+                    names, extra_values + values, child
+                ):
+                    lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """只增计数"""
+
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    """可增可减的当前值"""
+
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+
+class Histogram(_Metric):
+    """按上界累计分桶的分布, 附带 _sum 和 _count"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def _samples(
+        self, names: Tuple[str, ...], values: Tuple[str, ...], child
+    ) -> Iterator[Tuple[str, str, float]]:
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            labels = _format_labels(
+                names + ("le",), values + (_format_value(bound),)
+            )
+            yield "_bucket", labels, cumulative
+        labels = _format_labels(names, values)
+        yield "_sum", labels, child.sum
+        yield "_count", labels, child.count
+
+
+class MetricsRegistry:
+    """指标注册表, 同名指标只注册一次"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._remote: Dict[str, Dict[str, Dict[Tuple[str, ...], Any]]] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric):
+                raise ValueError(f"Metric {metric.name} already registered")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self) -> Dict[str, Dict[Tuple[str, ...], Any]]:
+        """当前所有子项的副本, 可跨进程传递"""
+        return {
+            name: copy.deepcopy(metric._children)
+            for name, metric in self._metrics.items()
+            if metric._children
+        }
+
+    def set_remote(self, shard: str, snapshot: Dict[str, Dict]) -> None:
+        """保存工作进程上报的快照, 输出时附加 shard 标签"""
+        self._remote[shard] = snapshot
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for name, metric in self._metrics.items():
+            remote = [
+                (shard, snapshot[name])
+                for shard, snapshot in sorted(self._remote.items())
+                if name in snapshot
+            ]
+            lines.extend(metric.render(remote))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
@@ -0,0 +1,103 @@
+"""
+请求容错 - 重试退避策略与熔断器
+"""
+
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+# 风控拦截: 不重试, 但计入熔断器失败
+BLOCKED_STATUS = {401, 403}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析Retry-After头 (秒数或HTTP日期)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    """指数退避 + 全抖动"""
+
+    def __init__(
+        self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 30.0
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """第attempt次重试前的等待时间"""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        cap = min(self.max_delay, self.base_delay * (2**attempt))
+        return random.uniform(0, cap)
+
+
+class CircuitBreaker:
+    """熔断器: closed -> open -> half_open -> closed"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """当前是否允许发起请求"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """放行的请求未得出结果(未发出或被取消), 归还半开探测名额"""
+        if self.state == self.HALF_OPEN:
+            self._probing = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        data = {"state": self.state, "failures": self.failures}
+        if self.state == self.OPEN:
+            data["retry_in"] = max(
+                0.0, self.recovery_timeout - (time.monotonic() - self.opened_at)
+            )
+        return data
@@ -5,7 +5,22 @@ TikTok X-Bogus签名生成器
 import base64
 import hashlib
 import time
-from typing import Tuple
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from .metrics import histogram
+
+EMPTY_MD5 = "d41d8cd98f00b204e9800998ecf8427e"
+STANDARD_ALPHABET = (
+    b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/="
+)
+CT_BYTES = (536919696).to_bytes(4, "big")
+
+SIGN_SECONDS = histogram(
+    "tiktok_sign_seconds",
+    "XBogusSigner.get_xbogus duration in seconds",
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005),
+).labels()
 
 
 class XBogusSigner:
@@ -17,109 +32,117 @@ class XBogusSigner:
         self.character = (
             "Dkdpgh4ZKsQB80/Mfvw36XI1R25-WUAlEi7NLboqYTOPuzmFjJnryx9HVGcaStCe="
         )
-        self.Array = [None] * 48 + list(range(10)) + [None] * 6 + list(range(10, 16))
+        self.alphabet = bytes.maketrans(STANDARD_ALPHABET, self.character.encode())
         self.ua_key = b"\x00\x01\x0c"
+        self._ua_cache: Optional[Tuple[str, List[int]]] = None
+        self._empty_array = self.md5_str_to_array(
+            self.md5(self.md5_str_to_array(EMPTY_MD5))
+        )
+
+    def ua_array(self) -> List[int]:
+        """UA的RC4+base64再MD5结果, 按UA缓存"""
+        if self._ua_cache is None or self._ua_cache[0] != self.user_agent:
+            ua_encoded = base64.b64encode(
+                self.rc4_encrypt(self.ua_key, self.user_agent.encode("ISO-8859-1"))
+            ).decode("ISO-8859-1")
+            self._ua_cache = (
+                self.user_agent,
+                self.md5_str_to_array(self.md5(ua_encoded)),
+            )
+        return self._ua_cache[1]
 
     def md5_str_to_array(self, md5_str: str) -> list:
         if len(md5_str) > 32:
-            return [ord(c) for c in md5_str]
-        array = []
-        for i in range(0, len(md5_str), 2):
-            array.append(
-                (self.Array[ord(md5_str[i])] << 4) | self.Array[ord(md5_str[i + 1])]
-            )
-        return array
+            return list(md5_str.encode("ISO-8859-1"))
+        return list(bytes.fromhex(md5_str))
 
-    def md5(self, data) -> str:
+    def _to_bytes(self, data) -> bytes:
         if isinstance(data, str):
-            data = self.md5_str_to_array(data)
-        return hashlib.md5(bytes(data)).hexdigest()
+            if len(data) > 32:
+                return data.encode("ISO-8859-1")
+            return bytes.fromhex(data)
+        return bytes(data)
+
+    def md5(self, data) -> str:
+        return hashlib.md5(self._to_bytes(data)).hexdigest()
+
+    def _md5_encrypt_digest(self, url_path: str) -> bytes:
+        return hashlib.md5(hashlib.md5(self._to_bytes(url_path)).digest()).digest()
 
     def md5_encrypt(self, url_path: str) -> list:
-        return self.md5_str_to_array(
-            self.md5(self.md5_str_to_array(self.md5(url_path)))
-        )
+        return list(self._md5_encrypt_digest(url_path))
 
     def rc4_encrypt(self, key: bytes, data: bytes) -> bytearray:
-        S = list(range(256))
+        S = bytearray(range(256))
+        key_len = len(key)
         j = 0
         for i in range(256):
-            j = (j + S[i] + key[i % len(key)]) % 256
+            j = (j + S[i] + key[i % key_len]) & 255
             S[i], S[j] = S[j], S[i]
-        result = []
+        result = bytearray(len(data))
         i = j = 0
-        for byte in data:
-            i = (i + 1) % 256
-            j = (j + S[i]) % 256
+        for n, byte in enumerate(data):
+            i = (i + 1) & 255
+            j = (j + S[i]) & 255
             S[i], S[j] = S[j], S[i]
-            result.append(byte ^ S[(S[i] + S[j]) % 256])
-        return bytearray(result)
+            result[n] = byte ^ S[(S[i] + S[j]) & 255]
+        return result
 
     def calculation(self, a: int, b: int, c: int) -> str:
-        x3 = ((a & 255) << 16) | ((b & 255) << 8) | c
         return (
-            self.character[(x3 & 16515072) >> 18]
-            + self.character[(x3 & 258048) >> 12]
-            + self.character[(x3 & 4032) >> 6]
-            + self.character[x3 & 63]
+            base64.b64encode(bytes((a & 255, b & 255, c & 255)))
+            .translate(self.alphabet)
+            .decode("ascii")
         )
 
-    def get_xbogus(self, url_path: str) -> Tuple[str, str]:
-        ua_encoded = base64.b64encode(
-            self.rc4_encrypt(self.ua_key, self.user_agent.encode("ISO-8859-1"))
-        ).decode("ISO-8859-1")
-        array1 = self.md5_str_to_array(self.md5(ua_encoded))
-        array2 = self.md5_str_to_array(
-            self.md5(self.md5_str_to_array("d41d8cd98f00b204e9800998ecf8427e"))
+    def _garbled_code(self, url_digest: bytes, timer_bytes: bytes) -> str:
+        array1 = self.ua_array()
+        array2 = self._empty_array
+        # 64, 0.00390625(取整为0), 1, 12, url/空串/UA摘要各两字节, 时间戳, ct
+        new_array = bytearray(19)
+        new_array[0:4] = b"\x40\x00\x01\x0c"
+        new_array[4] = url_digest[14]
+        new_array[5] = url_digest[15]
+        new_array[6] = array2[14]
+        new_array[7] = array2[15]
+        new_array[8] = array1[14]
+        new_array[9] = array1[15]
+        new_array[10:14] = timer_bytes
+        new_array[14:18] = CT_BYTES
+
+        xor_result = 0
+        for value in new_array[:18]:
+            xor_result ^= value
+        new_array[18] = xor_result
+
+        merge_array = new_array[0::2] + new_array[1::2]
+        return (
+            base64.b64encode(bytes(merge_array[:18]))
+            .translate(self.alphabet)
+            .decode("ascii")
         )
-        url_path_array = self.md5_encrypt(url_path)
-        timer = int(time.time())
-        ct = 536919696
-
-        new_array = [
-            64,
-            0.00390625,
-            1,
-            12,
-            url_path_array[14],
-            url_path_array[15],
-            array2[14],
-            array2[15],
-            array1[14],
-            array1[15],
-            (timer >> 24) & 255,
-            (timer >> 16) & 255,
-            (timer >> 8) & 255,
-            timer & 255,
-            (ct >> 24) & 255,
-            (ct >> 16) & 255,
-            (ct >> 8) & 255,
-            ct & 255,
-        ]
-
-        xor_result = new_array[0]
-        for i in range(1, len(new_array)):
-            xor_result ^= int(new_array[i])
-        new_array.append(xor_result)
-
-        array3, array4 = [], []
-        for i in range(0, len(new_array), 2):
-            array3.append(new_array[i])
-            if i + 1 < len(new_array):
-                array4.append(new_array[i + 1])
-
-        merge_array = array3 + array4
-        garbled_code = ""
-        for i in range(0, len(merge_array) - 2, 3):
-            garbled_code += self.calculation(
-                merge_array[i], merge_array[i + 1], merge_array[i + 2]
-            )
 
+    @staticmethod
+    def _timer_bytes(timestamp: Optional[int]) -> bytes:
+        timer = int(time.time()) if timestamp is None else timestamp
+        return (timer & 0xFFFFFFFF).to_bytes(4, "big")
+
+    def get_xbogus(self, url_path: str, timestamp: int = None) -> Tuple[str, str]:
+        start = time.perf_counter()
+        garbled_code = self._garbled_code(
+            self._md5_encrypt_digest(url_path), self._timer_bytes(timestamp)
+        )
+        SIGN_SECONDS.observe(time.perf_counter() - start)
         return f"{url_path}&X-Bogus={garbled_code}", garbled_code
 
 
+@lru_cache(maxsize=16)
+def _get_signer(user_agent: Optional[str]) -> XBogusSigner:
+    return XBogusSigner(user_agent)
+
+
 def sign_url(url: str, params: dict = None, user_agent: str = None) -> str:
-    signer = XBogusSigner(user_agent)
+    signer = _get_signer(user_agent)
     query = "&".join([f"{k}={v}" for k, v in (params or {}).items()])
     if "?" in url:
         full_url = f"{url}&{query}"
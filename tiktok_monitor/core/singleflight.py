@@ -0,0 +1,59 @@
+"""
+请求合并 - 同一目标的并发请求共享一次上游调用
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """按键合并并发调用, 可选在 ttl 秒内直接复用最近一次的成功结果"""
+
+    def __init__(self, ttl: float = 0.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._inflight: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        self._recent: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.stats = {"misses": 0, "shared": 0, "fresh_hits": 0}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        if self.ttl > 0:
+            recent = self._recent.get(key)
+            if recent is not None:
+                if time.monotonic() - recent[0] <= self.ttl:
+                    self.stats["fresh_hits"] += 1
+                    return recent[1]
+                del self._recent[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["shared"] += 1
+        else:
+            self.stats["misses"] += 1
+            # 上游调用独立成任务: 某个等待方被取消不会影响其他等待方
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        self._inflight.pop(key, None)
+        if self.ttl <= 0 or task.cancelled() or task.exception() is not None:
+            return
+        result = task.result()
+        # 失败(None)不缓存, 下次调用会重新请求
+        if result is None:
+            return
+        self._recent[key] = (time.monotonic(), result)
+        self._recent.move_to_end(key)
+        while len(self._recent) > self.max_entries:
+            self._recent.popitem(last=False)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "inflight": len(self._inflight),
+            "recent": len(self._recent),
+        }
@@ -2,6 +2,7 @@
 TikTok监控主程序
 """
 
+import argparse
 import asyncio
 import sys
 import os
@@ -11,26 +12,45 @@ sys.path.insert(0, PROJECT_ROOT)
 
 from core.config import settings
 from core.logger import logger
-from api.server import app
-from core.crawler import CrawlerManager
-from scheduler.scheduler import Scheduler
+from api.server import app, scheduler
+from scheduler.supervisor import WorkerSupervisor
 from storage.database import init_db
 
 
-async def main():
+async def main(workers: int = 0):
     logger.info("Starting TikTok Monitor...")
 
     await init_db()
 
-    crawler_manager = CrawlerManager(cookie=settings.cookie, proxy=settings.proxy)
-
-    scheduler = Scheduler(crawler_manager)
-    await scheduler.start()
+    scheduler_task = None
+    runner = scheduler
+    if settings.scheduler.enabled:
+        if workers > 0:
+            # 多进程模式: 调度与爬取交给分片工作进程, 本进程只提供API
+            runner = WorkerSupervisor(workers)
+            app.state.supervisor = runner
+        scheduler_task = asyncio.create_task(runner.start())
 
     import uvicorn
 
-    uvicorn.run(app, host=settings.app.host, port=settings.app.port)
+    server = uvicorn.Server(
+        uvicorn.Config(app, host=settings.app.host, port=settings.app.port)
+    )
+    try:
+        await server.serve()
+    finally:
+        if scheduler_task is not None:
+            await runner.stop()
+            scheduler_task.cancel()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="TikTok Monitor")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.scheduler.workers,
+        help="爬取工作进程数, 按 target_id 分片 (0 表示单进程)",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.workers))
@@ -1,3 +1,11 @@
 from .scheduler import Scheduler
+from .adaptive import AdaptiveIntervalPolicy
+from .sharding import ConsistentHashRing
+from .supervisor import WorkerSupervisor
 
-__all__ = ["Scheduler"]
+__all__ = [
+    "Scheduler",
+    "AdaptiveIntervalPolicy",
+    "ConsistentHashRing",
+    "WorkerSupervisor",
+]
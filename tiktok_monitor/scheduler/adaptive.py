@@ -0,0 +1,118 @@
+"""
+自适应轮询间隔 - 按指标变化速度伸缩
+"""
+
+from datetime import datetime
+from typing import Dict, Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import AdaptiveConfig, settings
+from storage.repositories import UserHistoryRepository, VideoHistoryRepository
+
+VELOCITY_METRICS = {
+    "video": ("play_count", "digg_count"),
+    "user": ("follower_count",),
+}
+
+
+def relative_velocity(
+    history: Sequence, metrics: Sequence[str], observed_at: Optional[datetime] = None
+) -> Optional[float]:
+    """历史快照(按时间倒序)中各指标的相对变化速度(每秒)取最大值
+
+    计数未变化时不写快照, observed_at(最近一次成功爬取的时间)晚于最新快照时,
+    这段没有变化的时间也计入, 速度随之衰减。
+    """
+    if not history:
+        return None
+    newest, oldest = history[0], history[-1]
+    end = newest.crawled_at
+    if observed_at is not None and observed_at > end:
+        end = observed_at
+    elapsed = (end - oldest.crawled_at).total_seconds()
+    if elapsed <= 0:
+        return None
+    velocity = 0.0
+    for metric in metrics:
+        current = getattr(newest, metric) or 0
+        previous = getattr(oldest, metric) or 0
+        velocity = max(
+            velocity, abs(current - previous) / max(previous, 1) / elapsed
+        )
+    return velocity
+
+
+class AdaptiveIntervalPolicy:
+    """根据最近变化速度计算下次轮询间隔, 并受全局请求预算约束"""
+
+    def __init__(self, config: AdaptiveConfig = None):
+        self.config = config or settings.monitoring.adaptive
+        self.video_history = VideoHistoryRepository()
+        self.user_history = UserHistoryRepository()
+        self._rates: Dict[int, float] = {}
+        self._total_rate = 0.0
+
+    def _clamp(self, interval: float) -> float:
+        return min(self.config.max_interval, max(self.config.min_interval, interval))
+
+    async def velocity(
+        self,
+        db: AsyncSession,
+        task_type: str,
+        target_id: str,
+        observed_at: Optional[datetime] = None,
+    ) -> Optional[float]:
+        if task_type == "video":
+            history = await self.video_history.get_history(
+                db, target_id, limit=self.config.history_window
+            )
+        else:
+            history = await self.user_history.get_history(
+                db, target_id, limit=self.config.history_window
+            )
+        return relative_velocity(
+            history, VELOCITY_METRICS.get(task_type, ()), observed_at
+        )
+
+    def interval_for(self, velocity: Optional[float], base_interval: float) -> float:
+        """速度越快间隔越短: 目标是每次轮询观察到 target_change 的相对变化"""
+        if velocity is None:
+            return self._clamp(base_interval)
+        if velocity <= 0:
+            return self.config.max_interval
+        return self._clamp(self.config.target_change / velocity)
+
+    def apply_budget(self, task_id: int, interval: float) -> float:
+        """总请求速率超出预算时按比例放大间隔"""
+        previous = self._rates.pop(task_id, 0.0)
+        self._total_rate -= previous
+        budget = self.config.request_budget_per_minute / 60.0
+        rate = 1.0 / interval
+        if budget > 0 and self._total_rate + rate > budget:
+            interval *= (self._total_rate + rate) / budget
+            rate = 1.0 / interval
+        self._rates[task_id] = rate
+        self._total_rate += rate
+        return interval
+
+    def forget(self, task_id: int) -> None:
+        self._total_rate -= self._rates.pop(task_id, 0.0)
+
+    async def next_interval(
+        self,
+        db: AsyncSession,
+        task_id: int,
+        task_type: str,
+        target_id: str,
+        base: int,
+        observed_at: Optional[datetime] = None,
+    ) -> Dict[str, Optional[float]]:
+        if task_type in VELOCITY_METRICS:
+            velocity = await self.velocity(db, task_type, target_id, observed_at)
+            interval = self.interval_for(velocity, base)
+        else:
+            # user_videos 不写用户历史快照, 无从估计速度, 保持任务自身的间隔
+            velocity, interval = None, float(base)
+        interval = self.apply_budget(task_id, interval)
+        return {"interval": interval, "velocity": velocity}
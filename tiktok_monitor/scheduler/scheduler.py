@@ -1,67 +1,420 @@
 """
-定时任务调度器
+定时任务调度器 - 按截止时间排序的最小堆
 """
 
 import asyncio
-from datetime import datetime
-from typing import List, Optional
+import heapq
+import os
+import random
+import socket
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from core.config import SchedulerConfig, settings
 from core.logger import logger
 from storage.database import async_session_maker
-from storage.repositories import MonitorTaskRepository
+from core.engine import PRIORITY_BACKGROUND
+from core.metrics import gauge
+from storage.repositories import MonitorTaskRepository, UserCrawlStateRepository
+from .adaptive import AdaptiveIntervalPolicy
+
+# 增量拉取任务时回看的时间窗口
+REFRESH_OVERLAP = timedelta(seconds=10)
+
+SCHEDULED_TASKS = gauge(
+    "tiktok_scheduler_tasks", "Monitor tasks scheduled by this process"
+).labels()
+RUNNING_TASKS = gauge(
+    "tiktok_scheduler_running_tasks", "Monitor tasks currently executing"
+).labels()
+SCHEDULER_LAG = gauge(
+    "tiktok_scheduler_lag_seconds",
+    "How long the most recently dispatched task waited past its due time",
+).labels()
+
+
+@dataclass
+class ScheduledTask:
+    """调度中的任务快照"""
+
+    task_id: int
+    task_type: str
+    target_id: str
+    interval: int
+    version: int = 0
 
 
 class Scheduler:
-    def __init__(self, crawler_manager):
-        self.crawler = crawler_manager
+    def __init__(
+        self,
+        engine,
+        config: SchedulerConfig = None,
+        adaptive: Optional[AdaptiveIntervalPolicy] = None,
+        owns: Optional[Callable[[str], bool]] = None,
+    ):
+        self.engine = engine
+        self.config = config or settings.scheduler
+        self.owner = self.config.worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        if adaptive is None and settings.monitoring.adaptive.enabled:
+            adaptive = AdaptiveIntervalPolicy()
+        self.adaptive = adaptive
+        self.owns = owns
+        self.effective_intervals: Dict[int, Dict[str, Optional[float]]] = {}
         self.running = False
-        self.tasks = {}
+        self.tasks: Dict[int, asyncio.Task] = {}
+        self._entries: Dict[int, ScheduledTask] = {}
+        self._heap: List[Tuple[float, int, int]] = []
+        self._versions = 0
+        # 在 start() 中创建: 模块导入时构造, Python < 3.10 会绑定到错误的事件循环
+        self._wakeup: Optional[asyncio.Event] = None
+        self._refreshed_at: Optional[datetime] = None
+        # 重叠窗口内已应用的任务版本 (任务ID -> updated_at), 避免重复应用
+        self._applied: Dict[int, datetime] = {}
+        self._full_refreshing: set = set()
+        self.stats = {
+            "dispatched": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "skipped_running": 0,
+            "last_lag": 0.0,
+        }
+
+    @property
+    def task_count(self) -> int:
+        return len(self._entries)
 
     async def start(self):
         """启动调度器"""
+        self._wakeup = asyncio.Event()
         self.running = True
-        logger.info("Scheduler started")
-        await self._run_tasks()
+        await self.engine.start()
+        if self.config.mode == "lease":
+            logger.info(f"Scheduler started in lease mode as {self.owner}")
+            await self._run_leased()
+            return
+        await self._load_tasks()
+        logger.info(f"Scheduler started with {len(self._entries)} tasks")
+        refresher = None
+        if self.config.refresh_interval > 0:
+            refresher = asyncio.create_task(self._refresh_tasks())
+        try:
+            await self._run_tasks()
+        finally:
+            if refresher is not None:
+                refresher.cancel()
 
     async def stop(self):
         """停止调度器"""
         self.running = False
+        self._wake()
+        for task in self.tasks.values():
+            if not task.done():
+                task.cancel()
+        await self.engine.stop()
         logger.info("Scheduler stopped")
 
-    async def _run_tasks(self):
-        """运行所有监控任务"""
+    async def _load_tasks(self):
+        """启动时一次性加载所有启用的任务"""
+        loaded_at = datetime.utcnow()
+        async with async_session_maker() as db:
+            task_repo = MonitorTaskRepository()
+            active_tasks = await task_repo.get_active_tasks(db)
+        self._refreshed_at = loaded_at
+        for task in active_tasks:
+            self.add_task(task)
+            if task.updated_at is not None:
+                self._applied[task.id] = task.updated_at
+
+    async def _refresh_tasks(self):
+        """定期增量拉取配置有变更的任务 (其他进程/批量导入创建或修改的任务)"""
         while self.running:
+            await asyncio.sleep(self.config.refresh_interval)
             try:
-                async with async_session_maker() as db:
-                    task_repo = MonitorTaskRepository()
-                    active_tasks = await task_repo.get_active_tasks(db)
-                    for task in active_tasks:
-                        task_id = task.id
-                        if task_id not in self.tasks or not self.tasks[task_id].done():
-                            self.tasks[task_id] = asyncio.create_task(
-                                self._execute_task(task)
-                            )
+                await self.refresh()
             except Exception as e:
-                logger.error(f"Scheduler error: {e}")
-            await asyncio.sleep(60)
+                logger.warning(f"Task refresh failed: {e}")
 
-    async def _execute_task(self, task):
-        """执行单个监控任务"""
+    async def refresh(self) -> int:
+        """拉取一次自上次加载后变更的任务, 返回变更数; 尚未加载任务时不做处理
+
+        updated_at 在事务提交前取值, 晚提交的事务可能带着更早的时间戳,
+        因此每次回看 REFRESH_OVERLAP, 按 (任务ID, updated_at) 去重。
+        """
+        if self._refreshed_at is None:
+            return 0
+        since = self._refreshed_at - REFRESH_OVERLAP
+        async with async_session_maker() as db:
+            tasks = await MonitorTaskRepository().get_tasks_updated_since(db, since)
+        changed = 0
+        for task in tasks:
+            if self._applied.get(task.id) == task.updated_at:
+                continue
+            self.add_task(task)
+            self._applied[task.id] = task.updated_at
+            self._refreshed_at = max(self._refreshed_at, task.updated_at)
+            changed += 1
+        since = self._refreshed_at - REFRESH_OVERLAP
+        self._applied = {
+            task_id: updated_at
+            for task_id, updated_at in self._applied.items()
+            if updated_at >= since
+        }
+        return changed
+
+    def add_task(self, task) -> None:
+        """新增或更新任务 (接收 MonitorTask 或同名属性对象)"""
+        if self.config.mode == "lease":
+            # 租约模式以任务表为准, 新任务 next_run_at 为空即可被认领
+            self._wake()
+            return
+        if not getattr(task, "enabled", True) or (
+            self.owns is not None and not self.owns(task.target_id)
+        ):
+            self.remove_task(task.id)
+            return
+        self._versions += 1
+        interval = task.interval or settings.monitoring.default_interval
+        entry = ScheduledTask(
+            task.id, task.task_type, task.target_id, interval, self._versions
+        )
+        self._entries[task.id] = entry
+        SCHEDULED_TASKS.set(len(self._entries))
+        self._push(entry, self._initial_delay(task.last_run, interval))
+
+    update_task = add_task
+
+    def remove_task(self, task_id: int) -> None:
+        """移除任务, 堆中的旧条目按版本号惰性丢弃"""
+        self._entries.pop(task_id, None)
+        SCHEDULED_TASKS.set(len(self._entries))
+        self.effective_intervals.pop(task_id, None)
+        if self.adaptive is not None:
+            self.adaptive.forget(task_id)
+
+    def get_effective_interval(self, task_id: int) -> Optional[float]:
+        """任务当前生效的轮询间隔(秒)"""
+        entry = self._entries.get(task_id)
+        if entry is None:
+            return None
+        effective = self.effective_intervals.get(task_id)
+        return effective["interval"] if effective else float(entry.interval)
+
+    def _initial_delay(self, last_run: Optional[datetime], interval: int) -> float:
+        if last_run is not None:
+            due = last_run + timedelta(seconds=interval)
+            delay = (due - datetime.utcnow()).total_seconds()
+            if delay > 0:
+                return delay
+        return random.uniform(0, min(interval, self.config.startup_spread))
+
+    def _next_delay(self, interval: float) -> float:
+        jitter = interval * self.config.jitter_ratio
+        return max(1.0, interval + random.uniform(-jitter, jitter))
+
+    def _wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _push(self, entry: ScheduledTask, delay: float) -> None:
+        due = asyncio.get_running_loop().time() + delay
+        heapq.heappush(self._heap, (due, entry.version, entry.task_id))
+        if self._heap[0][1] == entry.version:
+            self._wake()
+
+    async def _run_tasks(self):
+        """等待最近的截止时间并派发到期任务"""
+        loop = asyncio.get_running_loop()
+        while self.running:
+            now = loop.time()
+            while self._heap and self._heap[0][0] <= now:
+                due, version, task_id = heapq.heappop(self._heap)
+                entry = self._entries.get(task_id)
+                if entry is None or entry.version != version:
+                    continue
+                self._dispatch(entry, now - due)
+
+            timeout = self._heap[0][0] - now if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch(self, entry: ScheduledTask, lag: float) -> None:
+        running = self.tasks.get(entry.task_id)
+        if running is not None and not running.done():
+            self.stats["skipped_running"] += 1
+            self._push(entry, self._next_delay(entry.interval))
+            return
+        self.stats["dispatched"] += 1
+        self.stats["last_lag"] = lag
+        SCHEDULER_LAG.set(lag)
+        self.tasks[entry.task_id] = asyncio.create_task(self._execute_task(entry))
+        RUNNING_TASKS.set(len(self.tasks))
+
+    async def _execute_task(self, task: ScheduledTask):
+        """执行单个监控任务, 完成后按间隔重新入堆"""
         try:
+            await self.engine.submit_task(task.task_type, task.target_id)
+            self.stats["succeeded"] += 1
             async with async_session_maker() as db:
                 task_repo = MonitorTaskRepository()
-                if task.task_type == "video":
-                    await self.crawler.crawl_video(task.target_id)
-                elif task.task_type == "user":
-                    await self.crawler.crawl_user(task.target_id)
-                elif task.task_type == "user_videos":
-                    await self.crawler.crawl_user_videos(task.target_id)
-
-                await task_repo.update_last_run(db, task.id, success=True)
+                if not await task_repo.update_last_run(db, task.task_id, success=True):
+                    self.remove_task(task.task_id)
+                    return
+                await self._update_effective_interval(db, task)
+                await self._schedule_full_refresh(db, task)
         except Exception as e:
-            logger.error(f"Task {task.id} failed: {e}")
+            self.stats["failed"] += 1
+            logger.error(f"Task {task.task_id} failed: {e}")
             try:
                 async with async_session_maker() as db:
                     task_repo = MonitorTaskRepository()
-                    await task_repo.update_last_run(db, task.id, success=False)
+                    await task_repo.update_last_run(db, task.task_id, success=False)
             except:
                 pass
+        finally:
+            self.tasks.pop(task.task_id, None)
+            RUNNING_TASKS.set(len(self.tasks))
+            current = self._entries.get(task.task_id)
+            if self.running and current is not None and current.version == task.version:
+                self._push(
+                    current, self._next_delay(self.get_effective_interval(task.task_id))
+                )
+
+    async def _update_effective_interval(self, db, task: ScheduledTask) -> None:
+        if self.adaptive is not None:
+            # 刚成功爬取过, 计数未变的这段时间也计入速度
+            self.effective_intervals[task.task_id] = await self.adaptive.next_interval(
+                db,
+                task.task_id,
+                task.task_type,
+                task.target_id,
+                task.interval,
+                observed_at=datetime.utcnow(),
+            )
+
+    async def _schedule_full_refresh(self, db, task: ScheduledTask) -> None:
+        """增量爬取用户视频后, 按需提交一次低优先级的完整刷新"""
+        monitoring = settings.monitoring
+        if (
+            task.task_type != "user_videos"
+            or monitoring.user_videos_mode != "incremental"
+            or task.target_id in self._full_refreshing
+        ):
+            return
+        if not await UserCrawlStateRepository().full_refresh_due(
+            db, task.target_id, monitoring.full_refresh_interval
+        ):
+            return
+        self._full_refreshing.add(task.target_id)
+        future = self.engine.submit_task(
+            "user_videos_full", task.target_id, priority=PRIORITY_BACKGROUND
+        )
+        future.add_done_callback(
+            lambda done: self._full_refresh_done(task.target_id, done)
+        )
+
+    def _full_refresh_done(self, target_id: str, future: asyncio.Future) -> None:
+        self._full_refreshing.discard(target_id)
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning(
+                f"Full refresh for user {target_id} failed: {future.exception()}"
+            )
+
+    async def _run_leased(self):
+        """租约模式: 从任务表认领到期任务, 执行期间续租, 完成后释放"""
+        task_repo = MonitorTaskRepository()
+        renewer = asyncio.create_task(self._renew_leases())
+        try:
+            while self.running:
+                free = self.config.claim_batch_size - len(self.tasks)
+                claimed = []
+                if free > 0:
+                    try:
+                        async with async_session_maker() as db:
+                            claimed = await task_repo.claim_due_tasks(
+                                db, self.owner, free, self.config.lease_seconds
+                            )
+                    except Exception as e:
+                        logger.warning(f"Task claim failed: {e}")
+                now = datetime.utcnow()
+                for task in claimed:
+                    entry = ScheduledTask(
+                        task.id,
+                        task.task_type,
+                        task.target_id,
+                        task.interval or settings.monitoring.default_interval,
+                    )
+                    if task.next_run_at is not None:
+                        self.stats["last_lag"] = (now - task.next_run_at).total_seconds()
+                        SCHEDULER_LAG.set(self.stats["last_lag"])
+                    self.stats["dispatched"] += 1
+                    self.tasks[task.id] = asyncio.create_task(
+                        self._execute_leased(entry)
+                    )
+                RUNNING_TASKS.set(len(self.tasks))
+                if free > 0 and len(claimed) == free:
+                    continue
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), self.config.claim_poll_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            renewer.cancel()
+
+    async def _renew_leases(self):
+        task_repo = MonitorTaskRepository()
+        while self.running:
+            await asyncio.sleep(max(1.0, self.config.lease_seconds / 3))
+            try:
+                async with async_session_maker() as db:
+                    await task_repo.renew_leases(
+                        db, self.owner, list(self.tasks), self.config.lease_seconds
+                    )
+            except Exception as e:
+                logger.warning(f"Lease renewal failed: {e}")
+
+    async def _execute_leased(self, task: ScheduledTask):
+        """执行已认领的任务, 结束时释放租约并写入下次执行时间"""
+        success = False
+        cancelled = False
+        try:
+            await self.engine.submit_task(task.task_type, task.target_id)
+            success = True
+            self.stats["succeeded"] += 1
+            async with async_session_maker() as db:
+                await self._update_effective_interval(db, task)
+                await self._schedule_full_refresh(db, task)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"Task {task.task_id} failed: {e}")
+        finally:
+            self.tasks.pop(task.task_id, None)
+            RUNNING_TASKS.set(len(self.tasks))
+            # 被取消(停机)的任务立即交还, 其他进程可马上认领
+            if cancelled:
+                delay = 0.0
+            else:
+                effective = self.effective_intervals.get(task.task_id)
+                delay = self._next_delay(
+                    effective["interval"] if effective else task.interval
+                )
+            try:
+                async with async_session_maker() as db:
+                    await MonitorTaskRepository().release_task(
+                        db,
+                        task.task_id,
+                        self.owner,
+                        success,
+                        datetime.utcnow() + timedelta(seconds=delay),
+                    )
+            except Exception as e:
+                logger.warning(f"Lease release for task {task.task_id} failed: {e}")
+            self._wake()
@@ -0,0 +1,35 @@
+"""
+一致性哈希分片 - 按 target_id 将任务分配到工作进程
+"""
+
+import bisect
+import hashlib
+from typing import List, Tuple
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+class ConsistentHashRing:
+    """带虚拟节点的一致性哈希环, 调整分片数时只迁移少量任务"""
+
+    def __init__(self, shards: int, replicas: int = 160):
+        if shards < 1:
+            raise ValueError("shards must be >= 1")
+        self.shards = shards
+        self.replicas = replicas
+        points: List[Tuple[int, int]] = sorted(
+            (_hash(f"shard-{shard}#{replica}"), shard)
+            for shard in range(shards)
+            for replica in range(replicas)
+        )
+        self._keys = [point for point, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def get_shard(self, key: str) -> int:
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._shards[index]
+
+    def owns(self, shard: int, key: str) -> bool:
+        return self.get_shard(key) == shard
@@ -0,0 +1,215 @@
+"""
+多进程爬取 - 按 target_id 一致性哈希分片, 每个工作进程负责一个分片
+"""
+
+import asyncio
+import multiprocessing
+import os
+import queue
+import time
+from typing import Any, Dict, Optional
+
+from core.config import SchedulerConfig, settings
+from core.logger import logger
+from core.metrics import REGISTRY, counter, gauge
+from .sharding import ConsistentHashRing
+
+WORKER_UP = gauge("tiktok_worker_up", "Whether the crawl worker is alive", ("shard",))
+WORKER_RESTARTS = counter(
+    "tiktok_worker_restarts_total", "Crawl worker restarts", ("shard",)
+)
+
+
+def run_worker(shard: int, shards: int, reports, stop_event, report_interval: float):
+    """工作进程入口: 独立的连接池、写队列和调度器, 只调度本分片的任务"""
+    try:
+        asyncio.run(
+            _worker_main(shard, shards, reports, stop_event, report_interval)
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+async def _worker_main(shard, shards, reports, stop_event, report_interval):
+    from core.crawler import CrawlerManager
+    from core.engine import CrawlEngine
+    from storage.state_cache import LastStateCache
+    from storage.writer import WriteBehindWriter
+    from .scheduler import Scheduler
+
+    ring = ConsistentHashRing(shards)
+    manager = CrawlerManager(
+        cookie=settings.cookie,
+        proxy=settings.proxy,
+        writer=WriteBehindWriter() if settings.database.write_behind else None,
+        state_cache=LastStateCache(settings.monitoring.state_cache_size)
+        if settings.monitoring.change_detection
+        else None,
+    )
+    if settings.redis.enabled:
+        # API进程的读缓存在Redis中, 工作进程写入后同样需要失效
+        from api.cache import create_response_cache
+
+        response_cache = create_response_cache()
+        if response_cache is not None:
+            manager.add_write_listener(response_cache.on_write)
+    # 租约模式下由任务表认领分配任务, 不再按哈希过滤
+    owns = None
+    if settings.scheduler.mode != "lease":
+        owns = lambda target_id: ring.owns(shard, target_id)
+    scheduler = Scheduler(CrawlEngine(manager), owns=owns)
+    runner = asyncio.create_task(scheduler.start())
+
+    def report():
+        reports.put(
+            {
+                "shard": shard,
+                "pid": os.getpid(),
+                "time": time.time(),
+                "tasks": scheduler.task_count,
+                "pending": scheduler.engine.pending,
+                **scheduler.stats,
+                "metrics": REGISTRY.snapshot(),
+            }
+        )
+
+    try:
+        reported_at = time.monotonic()
+        while not runner.done() and not stop_event.is_set():
+            await asyncio.sleep(1)
+            if time.monotonic() - reported_at >= report_interval:
+                report()
+                reported_at = time.monotonic()
+    finally:
+        await scheduler.stop()
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+        report()
+
+
+class WorkerSupervisor:
+    """启动并看护各分片工作进程: 进程退出时自动重启, 汇总各分片吞吐"""
+
+    def __init__(self, workers: int, config: SchedulerConfig = None):
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        self.workers = workers
+        self.config = config or settings.scheduler
+        self._ctx = multiprocessing.get_context("spawn")
+        self._reports = self._ctx.Queue()
+        self._stop_event = self._ctx.Event()
+        self._processes: Dict[int, Any] = {}
+        self._reported: Dict[int, Dict[str, Any]] = {}
+        self.restarts = {shard: 0 for shard in range(workers)}
+        self.throughput: Dict[int, float] = {}
+        self.running = False
+
+    def _spawn(self, shard: int) -> None:
+        process = self._ctx.Process(
+            target=run_worker,
+            args=(
+                shard,
+                self.workers,
+                self._reports,
+                self._stop_event,
+                self.config.worker_report_interval,
+            ),
+            name=f"crawl-worker-{shard}",
+            daemon=True,
+        )
+        process.start()
+        self._processes[shard] = process
+        logger.info(f"Crawl worker {shard}/{self.workers} started (pid {process.pid})")
+
+    async def start(self):
+        """启动所有工作进程并持续看护"""
+        self.running = True
+        self._stop_event.clear()
+        for shard in range(self.workers):
+            self._spawn(shard)
+        logged_at = time.monotonic()
+        while self.running:
+            await asyncio.sleep(1)
+            self._drain_reports()
+            for shard, process in list(self._processes.items()):
+                if self.running and not process.is_alive():
+                    logger.warning(
+                        f"Crawl worker {shard} exited with code {process.exitcode}, "
+                        "restarting"
+                    )
+                    self.restarts[shard] += 1
+                    WORKER_RESTARTS.labels(str(shard)).inc()
+                    self._spawn(shard)
+            for shard, process in self._processes.items():
+                WORKER_UP.labels(str(shard)).set(1 if process.is_alive() else 0)
+            if time.monotonic() - logged_at >= self.config.worker_report_interval:
+                self._log_throughput()
+                logged_at = time.monotonic()
+
+    async def stop(self, timeout: float = 30.0):
+        """通知工作进程退出 (各自落库写队列), 超时后强制结束"""
+        self.running = False
+        self._stop_event.set()
+        deadline = time.monotonic() + timeout
+        loop = asyncio.get_running_loop()
+        for process in self._processes.values():
+            remaining = max(0.0, deadline - time.monotonic())
+            await loop.run_in_executor(None, process.join, remaining)
+            if process.is_alive():
+                logger.warning(f"Crawl worker {process.name} did not exit, terminating")
+                process.terminate()
+        self._drain_reports()
+        logger.info("Crawl workers stopped")
+
+    def _drain_reports(self) -> None:
+        while True:
+            try:
+                report = self._reports.get_nowait()
+            except queue.Empty:
+                return
+            shard = report["shard"]
+            REGISTRY.set_remote(str(shard), report.pop("metrics", {}))
+            previous = self._reported.get(shard)
+            # 同一进程的相邻两次上报计算吞吐, 进程重启后计数归零需重新计算
+            if previous is not None and previous["pid"] == report["pid"]:
+                elapsed = report["time"] - previous["time"]
+                if elapsed > 0:
+                    done = (report["succeeded"] + report["failed"]) - (
+                        previous["succeeded"] + previous["failed"]
+                    )
+                    self.throughput[shard] = done / elapsed
+            self._reported[shard] = report
+
+    def _log_throughput(self) -> None:
+        summary = ", ".join(
+            f"#{shard}: {self.throughput.get(shard, 0.0) * 60:.1f}/min"
+            for shard in range(self.workers)
+        )
+        logger.info(f"Crawl worker throughput: {summary}")
+
+    def metrics(self) -> Dict[str, Any]:
+        shards = []
+        for shard in range(self.workers):
+            process: Optional[Any] = self._processes.get(shard)
+            report = self._reported.get(shard, {})
+            shards.append(
+                {
+                    "shard": shard,
+                    "pid": process.pid if process is not None else None,
+                    "alive": process is not None and process.is_alive(),
+                    "restarts": self.restarts[shard],
+                    "tasks": report.get("tasks"),
+                    "pending": report.get("pending"),
+                    "dispatched": report.get("dispatched"),
+                    "succeeded": report.get("succeeded"),
+                    "failed": report.get("failed"),
+                    "last_lag": report.get("last_lag"),
+                    "throughput_per_minute": self.throughput.get(shard, 0.0) * 60,
+                    "reported_at": report.get("time"),
+                }
+            )
+        return {
+            "workers": self.workers,
+            "throughput_per_minute": sum(self.throughput.values()) * 60,
+            "shards": shards,
+        }
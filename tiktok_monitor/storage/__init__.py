@@ -1,12 +1,23 @@
 from .database import get_db, engine, async_session_maker, Base, init_db
-from .models import Video, User, VideoHistory, CrawlLog, MonitorTask
+from .models import (
+    Video,
+    User,
+    VideoHistory,
+    UserHistory,
+    UserCrawlState,
+    CrawlLog,
+    MonitorTask,
+)
 from .repositories import (
     VideoRepository,
     UserRepository,
     VideoHistoryRepository,
+    UserHistoryRepository,
+    UserCrawlStateRepository,
     CrawlLogRepository,
     MonitorTaskRepository,
 )
+from .leaderboard import Leaderboards
 
 __all__ = [
     "get_db",
@@ -17,11 +28,16 @@ __all__ = [
     "Video",
     "User",
     "VideoHistory",
+    "UserHistory",
+    "UserCrawlState",
     "CrawlLog",
     "MonitorTask",
     "VideoRepository",
     "UserRepository",
     "VideoHistoryRepository",
+    "UserHistoryRepository",
+    "UserCrawlStateRepository",
     "CrawlLogRepository",
     "MonitorTaskRepository",
+    "Leaderboards",
 ]
@@ -4,19 +4,54 @@
 
 import os
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Dict
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy import DateTime, event, func, inspect, select, text
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+    async_sessionmaker,
+)
 from sqlalchemy.orm import declarative_base
 
-from core.config import settings
+from core.config import DatabaseConfig, settings
+from core.logger import logger
 
 Base = declarative_base()
 
-engine = create_async_engine(
-    settings.database.url.replace("sqlite:///", "sqlite+aiosqlite:///"),
-    echo=settings.app.debug,
-)
+# 数据修正版本, 记录在 PRAGMA user_version
+SCHEMA_VERSION = 1
+
+
+def apply_pragmas(dbapi_connection, pragmas: Dict[str, Any]) -> None:
+    """在新建的连接上执行PRAGMA"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def create_engine(config: DatabaseConfig = None, echo: bool = False) -> AsyncEngine:
+    """按配置创建异步引擎, 每个池化连接都应用性能档位PRAGMA"""
+    config = config or settings.database
+    async_engine = create_async_engine(
+        config.url.replace("sqlite:///", "sqlite+aiosqlite:///"),
+        echo=echo,
+    )
+    pragmas = config.pragmas
+    if pragmas:
+
+        @event.listens_for(async_engine.sync_engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            apply_pragmas(dbapi_connection, pragmas)
+
+    return async_engine
+
+
+engine = create_engine(settings.database, echo=settings.app.debug)
 
 async_session_maker = async_sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
@@ -38,7 +73,94 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
 
 async def init_db():
     """初始化数据库表"""
-    from .models import Video, User, VideoHistory, CrawlLog, MonitorTask
+    from .models import Video, User, VideoHistory, UserHistory, CrawlLog, MonitorTask
 
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_create_missing_indexes)
+        await conn.run_sync(_migrate)
+
+
+def _add_missing_columns(sync_conn) -> None:
+    """为已存在的表补加新增的可空列 (create_all 不会修改已有表)"""
+    inspector = inspect(sync_conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=sync_conn.dialect)
+            sync_conn.execute(
+                text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}')
+            )
+
+
+def _create_missing_indexes(sync_conn) -> None:
+    """为已存在的表补建新增索引 (create_all 只在建表时创建索引)"""
+    inspector = inspect(sync_conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            if index.unique:
+                _delete_duplicates(sync_conn, table, index)
+            index.create(sync_conn)
+
+
+def _delete_duplicates(sync_conn, table, index) -> None:
+    """新增唯一索引前删除旧数据中的重复行, 每组保留最早(id最小)的一行"""
+    keep = select(func.min(table.c.id)).group_by(*index.columns)
+    result = sync_conn.execute(table.delete().where(table.c.id.not_in(keep)))
+    if result.rowcount:
+        logger.warning(
+            f"Removed {result.rowcount} duplicate rows from {table.name} "
+            f"before creating {index.name}"
+        )
+
+
+def _migrate(sync_conn) -> None:
+    """按 PRAGMA user_version 执行一次性的数据修正, 已执行过的不再重复"""
+    version = sync_conn.execute(text("PRAGMA user_version")).scalar() or 0
+    if version < 1:
+        _fill_null_sort_keys(sync_conn)
+    if version < SCHEMA_VERSION:
+        sync_conn.execute(text(f"PRAGMA user_version = {SCHEMA_VERSION}"))
+
+
+def _sort_key_columns():
+    for mapper in Base.registry.mappers:
+        table = mapper.class_.__table__
+        for key in getattr(mapper.class_, "sort_keys", ()):
+            yield table, table.columns[key]
+
+
+def _set_column(table, column, value):
+    """修正单列的UPDATE, 显式保留 updated_at 以免触发 onupdate"""
+    values = {column.name: value}
+    if "updated_at" in table.columns and column.name != "updated_at":
+        values["updated_at"] = table.columns["updated_at"]
+    return table.update().values(values)
+
+
+def _fill_null_sort_keys(sync_conn) -> None:
+    """排序键为NULL的旧数据用同类型的列默认值(时间列用 created_at)补齐
+
+    没有同类型默认值的列(如 create_time)保留NULL, 由分页按NULL排序处理。
+    """
+    for table, column in _sort_key_columns():
+        if not column.nullable:
+            continue
+        default = column.default
+        if (
+            default is not None
+            and default.is_scalar
+            and isinstance(default.arg, column.type.python_type)
+        ):
+            value = default.arg
+        elif isinstance(column.type, DateTime) and "created_at" in table.columns:
+            value = table.columns["created_at"]
+        else:
+            continue
+        sync_conn.execute(_set_column(table, column, value).where(column.is_(None)))
@@ -0,0 +1,119 @@
+"""
+流式导出 - 服务端游标分批读取, 逐批输出 NDJSON / CSV
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, List, Optional, Sequence
+
+from sqlalchemy import select
+
+from .database import async_session_maker
+from .models import User, UserHistory, Video, VideoHistory
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+# 导出表 -> (模型, 时间范围过滤列)
+EXPORT_TABLES = {
+    "videos": (Video, "updated_at"),
+    "users": (User, "updated_at"),
+    "video_history": (VideoHistory, "crawled_at"),
+    "user_history": (UserHistory, "crawled_at"),
+}
+
+
+def build_export_query(
+    table: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    video_ids: Optional[Sequence[str]] = None,
+    author_ids: Optional[Sequence[str]] = None,
+    sec_uids: Optional[Sequence[str]] = None,
+):
+    """按表和过滤条件构造按主键排序的只读查询 (只取列, 不构造ORM对象)"""
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Unknown export table: {table}")
+    model, time_column = EXPORT_TABLES[table]
+    stmt = select(*model.__table__.columns)
+
+    if start is not None:
+        stmt = stmt.where(getattr(model, time_column) >= start)
+    if end is not None:
+        stmt = stmt.where(getattr(model, time_column) < end)
+    if video_ids:
+        if not hasattr(model, "video_id"):
+            raise ValueError(f"video_id filter does not apply to {table}")
+        stmt = stmt.where(model.video_id.in_(video_ids))
+    if author_ids:
+        if model is Video:
+            stmt = stmt.where(Video.author_id.in_(author_ids))
+        elif model is VideoHistory:
+            stmt = stmt.where(
+                VideoHistory.video_id.in_(
+                    select(Video.video_id).where(Video.author_id.in_(author_ids))
+                )
+            )
+        else:
+            raise ValueError(f"author_id filter does not apply to {table}")
+    if sec_uids:
+        if not hasattr(model, "sec_uid"):
+            raise ValueError(f"sec_uid filter does not apply to {table}")
+        stmt = stmt.where(model.sec_uid.in_(sec_uids))
+    return stmt.order_by(model.id)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _csv_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+async def stream_export(
+    stmt, fmt: str = "ndjson", batch_size: int = EXPORT_BATCH_SIZE
+) -> AsyncIterator[str]:
+    """用服务端游标分批读取, 每批编码为一个文本块产出, 内存占用与总行数无关"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    async with async_session_maker() as db:
+        result = await db.stream(stmt.execution_options(yield_per=batch_size))
+        columns: List[str] = list(result.keys())
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            yield buffer.getvalue()
+
+        async for partition in result.partitions(batch_size):
+            if fmt == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerows(
+                    [_csv_value(value) for value in row] for row in partition
+                )
+                yield buffer.getvalue()
+            else:
+                yield "".join(
+                    json.dumps(
+                        dict(zip(columns, row)),
+                        default=_json_default,
+                        ensure_ascii=False,
+                    )
+                    + "\n"
+                    for row in partition
+                )
+
+
+def parse_id_list(values: Optional[List[str]]) -> Optional[List[str]]:
+    """支持重复参数和逗号分隔两种写法"""
+    if not values:
+        return None
+    ids = [item.strip() for value in values for item in value.split(",")]
+    return [item for item in ids if item] or None
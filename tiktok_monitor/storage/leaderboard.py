@@ -0,0 +1,250 @@
+"""
+排行榜 - 内存中增量维护的前K名
+"""
+
+import heapq
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import LeaderboardConfig, settings
+from .repositories import UserRepository, VideoRepository
+
+VIDEO_LEADERBOARD_METRICS = ("play_count", "digg_count", "share_count")
+USER_LEADERBOARD_METRICS = ("follower_count",)
+WINDOWS = {"1d": 86400, "7d": 7 * 86400, "30d": 30 * 86400}
+
+BoardKey = Tuple[str, str, Optional[str], Optional[str]]
+
+
+def _row_dict(obj) -> Dict[str, Any]:
+    return {column.name: getattr(obj, column.name) for column in obj.__table__.columns}
+
+
+def _scope_predicate(
+    author_id: Optional[str], window: Optional[str]
+) -> Callable[[Dict[str, Any]], bool]:
+    """按作者和/或发布时间窗口筛选行, 窗口按读取时的当前时间计算"""
+    seconds = WINDOWS[window] if window is not None else None
+
+    def matches(row: Dict[str, Any]) -> bool:
+        if author_id is not None and row.get("author_id") != author_id:
+            return False
+        if seconds is not None:
+            return (row.get("create_time") or 0) >= time.time() - seconds
+        return True
+
+    return matches
+
+
+class TopKBoard:
+    """有界前K名: 成员字典 + 惰性删除的最小堆
+
+    容量大于展示数量, 少量成员下降或过期后仍能给出完整结果;
+    complete 表示板上包含全部符合条件的行, 否则缺人时需要重建。
+    """
+
+    def __init__(
+        self,
+        metric: str,
+        key_field: str,
+        capacity: int,
+        predicate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ):
+        self.metric = metric
+        self.key_field = key_field
+        self.capacity = capacity
+        self.predicate = predicate
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.complete = False
+        self.loaded_at = 0.0
+        self._heap: List[Tuple[int, str]] = []
+        self._sorted: Optional[List[Dict[str, Any]]] = None
+
+    def _score(self, row: Dict[str, Any]) -> int:
+        return row.get(self.metric) or 0
+
+    def load(self, rows: List[Dict[str, Any]]) -> None:
+        """用数据库查询结果(已按指标倒序)重建"""
+        self.entries = {row[self.key_field]: row for row in rows[: self.capacity]}
+        self.complete = len(rows) < self.capacity
+        self.loaded_at = time.monotonic()
+        self._rebuild_heap()
+
+    def _rebuild_heap(self) -> None:
+        self._heap = [(self._score(row), key) for key, row in self.entries.items()]
+        heapq.heapify(self._heap)
+        self._sorted = None
+
+    def _smallest(self) -> Optional[Tuple[int, str]]:
+        while self._heap:
+            score, key = self._heap[0]
+            entry = self.entries.get(key)
+            if entry is not None and self._score(entry) == score:
+                return score, key
+            heapq.heappop(self._heap)
+        return None
+
+    def update(self, row: Dict[str, Any]) -> None:
+        key = row.get(self.key_field)
+        if not key:
+            return
+        existing = self.entries.get(key)
+        if existing is not None:
+            row = {**existing, **row}
+        if self.predicate is not None and not self.predicate(row):
+            if existing is not None:
+                del self.entries[key]
+                self._sorted = None
+            return
+        score = self._score(row)
+        if existing is None and len(self.entries) >= self.capacity:
+            smallest = self._smallest()
+            if smallest is None or score <= smallest[0]:
+                return
+            heapq.heappop(self._heap)
+            del self.entries[smallest[1]]
+            self.complete = False
+        if existing is not None and self._score(existing) == score:
+            self.entries[key] = row
+        else:
+            self.entries[key] = row
+            heapq.heappush(self._heap, (score, key))
+        self._sorted = None
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+    def discard(self, key: str) -> None:
+        if self.entries.pop(key, None) is not None:
+            self._sorted = None
+
+    def top(self, limit: int) -> List[Dict[str, Any]]:
+        if self._sorted is None:
+            self._sorted = sorted(
+                self.entries.values(),
+                key=lambda row: (-self._score(row), row[self.key_field]),
+            )
+        if self.predicate is None:
+            return self._sorted[:limit]
+        # 时间窗口会随时间推移而过期, 读取时再过滤
+        return [row for row in self._sorted if self.predicate(row)][:limit]
+
+    def needs_reload(self, limit: int, max_age: float) -> bool:
+        if time.monotonic() - self.loaded_at > max_age:
+            return True
+        return not self.complete and len(self.top(limit)) < limit
+
+
+class Leaderboards:
+    """视频(播放/点赞/分享)与用户(粉丝)排行榜, 可按作者或发布时间窗口细分"""
+
+    def __init__(self, config: LeaderboardConfig = None):
+        self.config = config or settings.leaderboard
+        self.video_repo = VideoRepository()
+        self.user_repo = UserRepository()
+        self._boards: "OrderedDict[BoardKey, TopKBoard]" = OrderedDict()
+        self.stats = {"reads": 0, "reloads": 0, "updates": 0}
+
+    @property
+    def capacity(self) -> int:
+        return self.config.size * 2
+
+    def _new_board(self, key: BoardKey) -> TopKBoard:
+        kind, metric, author_id, window = key
+        predicate: Optional[Callable[[Dict[str, Any]], bool]] = None
+        if author_id is not None or window is not None:
+            predicate = _scope_predicate(author_id, window)
+        key_field = "video_id" if kind == "video" else "sec_uid"
+        return TopKBoard(metric, key_field, self.capacity, predicate)
+
+    async def _reload(self, db: AsyncSession, key: BoardKey, board: TopKBoard) -> None:
+        kind, metric, author_id, window = key
+        if kind == "video":
+            rows = await self.video_repo.get_top_videos(
+                db,
+                self.capacity,
+                metric,
+                author_id=author_id,
+                created_after=int(time.time() - WINDOWS[window]) if window else None,
+            )
+        else:
+            rows = await self.user_repo.get_top_users(db, self.capacity, metric)
+        board.load([_row_dict(row) for row in rows])
+        self.stats["reloads"] += 1
+
+    async def top(
+        self,
+        db: AsyncSession,
+        kind: str,
+        metric: str,
+        limit: int = 10,
+        author_id: Optional[str] = None,
+        window: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """读取排行榜; 首次读取、过期或成员不足时从数据库重建"""
+        if kind == "video":
+            metrics = VIDEO_LEADERBOARD_METRICS
+        else:
+            metrics = USER_LEADERBOARD_METRICS
+        if metric not in metrics:
+            raise ValueError(f"Unsupported leaderboard metric: {metric}")
+        if window is not None and window not in WINDOWS:
+            raise ValueError(f"Unsupported window: {window}")
+        if kind != "video" and (author_id is not None or window is not None):
+            raise ValueError("author_id/window only apply to video leaderboards")
+        limit = max(1, min(limit, self.config.size))
+
+        key = (kind, metric, author_id, window)
+        board = self._boards.get(key)
+        if board is None:
+            board = self._boards[key] = self._new_board(key)
+            self._evict_scoped()
+        self._boards.move_to_end(key)
+        if board.needs_reload(limit, self.config.rebuild_interval):
+            await self._reload(db, key, board)
+        self.stats["reads"] += 1
+        rows = board.top(limit)
+        # 增量写入的新成员只带爬取字段, 返回前用数据库整行补全
+        missing = [row[board.key_field] for row in rows if row.get("id") is None]
+        if missing:
+            await self._hydrate(db, kind, board, missing)
+            rows = board.top(limit)
+        return rows
+
+    async def _hydrate(
+        self, db: AsyncSession, kind: str, board: TopKBoard, keys: List[str]
+    ) -> None:
+        repo = self.video_repo if kind == "video" else self.user_repo
+        found = {}
+        for obj in await repo.get_many_by(db, board.key_field, keys):
+            found[getattr(obj, board.key_field)] = _row_dict(obj)
+        for key in keys:
+            if key in found:
+                board.update(found[key])
+            else:
+                board.discard(key)
+
+    def _evict_scoped(self) -> None:
+        """按作者/时间窗口细分的榜单按LRU限制数量, 全局榜单常驻"""
+        scoped = [key for key in self._boards if key[2] is not None or key[3]]
+        for key in scoped[: max(0, len(scoped) - self.config.max_scoped_boards)]:
+            del self._boards[key]
+
+    async def on_write(self, grouped: Dict[str, List[Dict[str, Any]]]) -> None:
+        """爬虫写入提交后增量更新所有相关榜单"""
+        by_author: Dict[str, List[Dict[str, Any]]] = {}
+        for row in grouped.get("video", ()):
+            by_author.setdefault(row.get("author_id"), []).append(row)
+        for (kind, _, author_id, _), board in self._boards.items():
+            if author_id is not None:
+                rows = by_author.get(author_id, ())
+            else:
+                rows = grouped.get(kind, ())
+            for row in rows:
+                board.update(row)
+            self.stats["updates"] += len(rows)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "boards": len(self._boards)}
@@ -12,6 +12,7 @@ from sqlalchemy import (
     Text,
     Boolean,
     Float,
+    Index,
 )
 from .database import Base
 
@@ -20,6 +21,16 @@ class Video(Base):
     """视频模型"""
 
     __tablename__ = "videos"
+    __table_args__ = (
+        Index("ix_videos_play_count", "play_count"),
+        Index("ix_videos_digg_count", "digg_count"),
+        Index("ix_videos_share_count", "share_count"),
+        Index("ix_videos_author_id_play_count", "author_id", "play_count"),
+        Index("ix_videos_create_time", "create_time"),
+        Index("ix_videos_updated_at", "updated_at"),
+    )
+    # 键集分页可用的排序键 (均有索引, SQLite索引隐含 rowid 即 id 作为次序)
+    sort_keys = ("id", "play_count", "digg_count", "create_time", "updated_at")
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     video_id = Column(String(64), unique=True, index=True, nullable=False)
@@ -40,6 +51,11 @@ class User(Base):
     """用户模型"""
 
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_follower_count", "follower_count"),
+        Index("ix_users_updated_at", "updated_at"),
+    )
+    sort_keys = ("id", "follower_count", "updated_at")
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     sec_uid = Column(String(128), unique=True, index=True, nullable=False)
@@ -57,15 +73,50 @@ class VideoHistory(Base):
     """视频数据历史记录"""
 
     __tablename__ = "video_history"
+    __table_args__ = (
+        Index("ix_video_history_video_id_crawled_at", "video_id", "crawled_at"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    video_id = Column(String(64), index=True, nullable=False)
+    video_id = Column(String(64), nullable=False)
     digg_count = Column(BigInteger, default=0)
     share_count = Column(BigInteger, default=0)
     comment_count = Column(BigInteger, default=0)
     play_count = Column(BigInteger, default=0)
     collect_count = Column(BigInteger, default=0)
-    crawled_at = Column(DateTime, default=datetime.utcnow)
+    crawled_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class UserHistory(Base):
+    """用户数据历史记录"""
+
+    __tablename__ = "user_history"
+    __table_args__ = (
+        Index("ix_user_history_sec_uid_crawled_at", "sec_uid", "crawled_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    sec_uid = Column(String(128), nullable=False)
+    follower_count = Column(BigInteger, default=0)
+    following_count = Column(BigInteger, default=0)
+    likes_count = Column(BigInteger, default=0)
+    video_count = Column(Integer, default=0)
+    crawled_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class UserCrawlState(Base):
+    """用户视频列表爬取进度 (增量爬取水位)"""
+
+    __tablename__ = "user_crawl_state"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    sec_uid = Column(String(128), unique=True, index=True, nullable=False)
+    newest_create_time = Column(BigInteger)
+    newest_video_id = Column(String(64))
+    last_cursor = Column(BigInteger, default=0)
+    last_full_refresh = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
 class CrawlLog(Base):
@@ -85,6 +136,17 @@ class MonitorTask(Base):
     """监控任务"""
 
     __tablename__ = "monitor_tasks"
+    __table_args__ = (
+        Index("ix_monitor_tasks_enabled_next_run_at", "enabled", "next_run_at"),
+        Index("ix_monitor_tasks_updated_at", "updated_at"),
+        # 同一目标只保留一个任务, 批量导入按此去重
+        Index(
+            "uq_monitor_tasks_task_type_target_id",
+            "task_type",
+            "target_id",
+            unique=True,
+        ),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     task_type = Column(String(32), nullable=False)
@@ -94,5 +156,8 @@ class MonitorTask(Base):
     enabled = Column(Boolean, default=True)
     last_run = Column(DateTime)
     last_status = Column(String(32))
+    next_run_at = Column(DateTime)
+    owner = Column(String(128))
+    lease_expires_at = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
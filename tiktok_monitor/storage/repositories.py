@@ -2,11 +2,57 @@
 数据访问层
 """
 
-from datetime import datetime
-from typing import List, Optional
-from sqlalchemy import select, update, delete
+import base64
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import func, select, update, delete, insert, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from .models import Video, User, VideoHistory, CrawlLog, MonitorTask
+from core.metrics import histogram
+from .models import (
+    Video,
+    User,
+    VideoHistory,
+    UserHistory,
+    UserCrawlState,
+    CrawlLog,
+    MonitorTask,
+)
+
+UPSERT_BATCH_SIZE = 500
+IMPORT_BATCH_SIZE = 5000
+MAX_PAGE_SIZE = 500
+
+WRITE_SECONDS = histogram(
+    "tiktok_db_write_seconds",
+    "Repository write latency (commit included when the call commits)",
+    ("table", "operation"),
+)
+
+
+def encode_cursor(sort: str, descending: bool, value: Any, last_id: int) -> str:
+    """把上一页最后一行的排序键编码为不透明游标"""
+    if isinstance(value, datetime):
+        value = {"dt": value.isoformat()}
+    payload = json.dumps([sort, descending, value, last_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, descending: bool) -> Tuple[Any, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, cursor_desc, value, last_id = json.loads(
+            base64.urlsafe_b64decode(padded)
+        )
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["dt"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort or cursor_desc != descending:
+        raise ValueError("Cursor does not match sort order")
+    return value, int(last_id)
 
 
 class BaseRepository:
@@ -15,14 +61,142 @@ class BaseRepository:
     def __init__(self, model):
         self.model = model
 
+    async def _bulk_upsert(
+        self, db: AsyncSession, key: str, rows: List[dict], commit: bool = True
+    ) -> int:
+        """按唯一键批量 INSERT ... ON CONFLICT DO UPDATE, 单个事务提交"""
+        start = time.perf_counter()
+        latest: Dict[str, dict] = {}
+        for row in rows:
+            if row.get(key):
+                latest[row[key]] = row
+        if not latest:
+            return 0
+
+        now = datetime.utcnow()
+        groups: Dict[tuple, List[dict]] = {}
+        for row in latest.values():
+            values = {
+                k: v for k, v in row.items() if k in self.model.__table__.columns
+            }
+            values["updated_at"] = now
+            groups.setdefault(tuple(sorted(values)), []).append(values)
+
+        for columns, group in groups.items():
+            for i in range(0, len(group), UPSERT_BATCH_SIZE):
+                stmt = sqlite_insert(self.model).values(
+                    group[i : i + UPSERT_BATCH_SIZE]
+                )
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[key],
+                    set_={
+                        column: stmt.excluded[column]
+                        for column in columns
+                        if column not in (key, "id", "created_at")
+                    },
+                )
+                await db.execute(stmt)
+        if commit:
+            await db.commit()
+        WRITE_SECONDS.labels(self.model.__tablename__, "upsert").observe(
+            time.perf_counter() - start
+        )
+        return len(latest)
+
+    async def _insert_many(
+        self, db: AsyncSession, rows: List[dict], commit: bool = True
+    ) -> None:
+        """批量插入 (executemany)"""
+        with WRITE_SECONDS.labels(self.model.__tablename__, "insert").time():
+            if rows:
+                await db.execute(insert(self.model), rows)
+            if commit:
+                await db.commit()
+
     async def get_by_id(self, db: AsyncSession, id: int):
         result = await db.execute(select(self.model).where(self.model.id == id))
         return result.scalar_one_or_none()
 
+    async def get_many_by(self, db: AsyncSession, field: str, values: List[Any]):
+        """按某一列的取值批量查询"""
+        column = getattr(self.model, field)
+        result = await db.execute(select(self.model).where(column.in_(values)))
+        return result.scalars().all()
+
     async def get_all(self, db: AsyncSession, limit: int = 100, offset: int = 0):
         result = await db.execute(select(self.model).limit(limit).offset(offset))
         return result.scalars().all()
 
+    async def get_page(
+        self,
+        db: AsyncSession,
+        sort: str = "id",
+        descending: bool = False,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+    ) -> Tuple[list, Optional[str]]:
+        """按 (sort, id) 键集分页, 返回 (本页数据, 下一页游标)
+
+        游标定位走索引, 任意深度的页代价与首页相同; offset 仅为兼容旧调用。
+        """
+        if sort not in getattr(self.model, "sort_keys", ("id",)):
+            raise ValueError(f"Unsupported sort key: {sort}")
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        column = getattr(self.model, sort)
+        id_column = self.model.id
+
+        # 只取列, 返回按属性可读的结果行, 省去构造ORM对象和身份映射的开销
+        base = select(*self.model.__table__.columns)
+        stmt = base
+        null_tail = False
+        if cursor:
+            value, last_id = decode_cursor(cursor, sort, descending)
+            if sort == "id":
+                stmt = stmt.where(
+                    id_column < last_id if descending else id_column > last_id
+                )
+            elif value is None:
+                # NULL 在升序中排最前, 在倒序中排最后
+                if descending:
+                    stmt = stmt.where(column.is_(None), id_column < last_id)
+                else:
+                    stmt = stmt.where(or_(column.is_not(None), id_column > last_id))
+            elif descending:
+                stmt = stmt.where(
+                    column <= value, or_(column < value, id_column < last_id)
+                )
+                null_tail = column.nullable
+            else:
+                stmt = stmt.where(
+                    column >= value, or_(column > value, id_column > last_id)
+                )
+        if descending:
+            order = [column.desc(), id_column.desc()]
+        else:
+            order = [column.asc(), id_column.asc()]
+        if sort == "id":
+            order = order[:1]
+        stmt = stmt.order_by(*order).limit(limit + 1)
+        if offset:
+            stmt = stmt.offset(offset)
+
+        rows = (await db.execute(stmt)).all()
+        if null_tail and len(rows) <= limit:
+            # 非NULL行已取完, 接着取倒序排在末尾的NULL行 (分开查询以保留索引定位)
+            tail = (
+                base.where(column.is_(None))
+                .order_by(id_column.desc())
+                .limit(limit + 1 - len(rows))
+            )
+            rows += (await db.execute(tail)).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(sort, descending, getattr(last, sort), last.id)
+        return rows, next_cursor
+
     async def delete(self, db: AsyncSession, id: int):
         await db.execute(delete(self.model).where(self.model.id == id))
         await db.commit()
@@ -50,13 +224,33 @@ class VideoRepository(BaseRepository):
             db.add(video)
         await db.commit()
 
+    async def bulk_upsert(
+        self, db: AsyncSession, rows: List[dict], commit: bool = True
+    ) -> int:
+        """批量写入视频 (按video_id冲突更新)"""
+        return await self._bulk_upsert(db, "video_id", rows, commit)
+
     async def get_videos_by_author(self, db: AsyncSession, author_id: str):
         result = await db.execute(select(Video).where(Video.author_id == author_id))
         return result.scalars().all()
 
-    async def get_top_videos(self, db: AsyncSession, limit: int = 10):
+    async def get_top_videos(
+        self,
+        db: AsyncSession,
+        limit: int = 10,
+        metric: str = "play_count",
+        author_id: Optional[str] = None,
+        created_after: Optional[int] = None,
+    ):
+        """按指标倒序取前 limit 个视频, 可限定作者或发布时间"""
+        column = getattr(Video, metric)
+        stmt = select(Video)
+        if author_id is not None:
+            stmt = stmt.where(Video.author_id == author_id)
+        if created_after is not None:
+            stmt = stmt.where(Video.create_time >= created_after)
         result = await db.execute(
-            select(Video).order_by(Video.play_count.desc()).limit(limit)
+            stmt.order_by(column.desc(), Video.id.desc()).limit(limit)
         )
         return result.scalars().all()
 
@@ -87,6 +281,22 @@ class UserRepository(BaseRepository):
             db.add(user)
         await db.commit()
 
+    async def bulk_upsert(
+        self, db: AsyncSession, rows: List[dict], commit: bool = True
+    ) -> int:
+        """批量写入用户 (按sec_uid冲突更新)"""
+        return await self._bulk_upsert(db, "sec_uid", rows, commit)
+
+    async def get_top_users(
+        self, db: AsyncSession, limit: int = 10, metric: str = "follower_count"
+    ):
+        """按指标倒序取前 limit 个用户"""
+        column = getattr(User, metric)
+        result = await db.execute(
+            select(User).order_by(column.desc(), User.id.desc()).limit(limit)
+        )
+        return result.scalars().all()
+
 
 class VideoHistoryRepository(BaseRepository):
     """视频历史数据仓储"""
@@ -99,14 +309,98 @@ class VideoHistoryRepository(BaseRepository):
         db.add(history)
         await db.commit()
 
-    async def get_history(self, db: AsyncSession, video_id: str, limit: int = 100):
+    async def add_many(self, db: AsyncSession, rows: List[dict], commit: bool = True):
+        """批量写入历史快照"""
+        await self._insert_many(db, rows, commit)
+
+    async def get_history(
+        self,
+        db: AsyncSession,
+        video_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 100,
+    ):
+        """按时间范围查询视频历史, 返回只读结果行
+
+        走 (video_id, crawled_at) 复合索引。
+        """
+        query = select(*VideoHistory.__table__.columns).where(
+            VideoHistory.video_id == video_id
+        )
+        if start is not None:
+            query = query.where(VideoHistory.crawled_at >= start)
+        if end is not None:
+            query = query.where(VideoHistory.crawled_at < end)
+        result = await db.execute(
+            query.order_by(VideoHistory.crawled_at.desc()).limit(limit)
+        )
+        return result.all()
+
+
+class UserHistoryRepository(BaseRepository):
+    """用户历史数据仓储"""
+
+    def __init__(self):
+        super().__init__(UserHistory)
+
+    async def add_many(self, db: AsyncSession, rows: List[dict], commit: bool = True):
+        """批量写入历史快照"""
+        await self._insert_many(db, rows, commit)
+
+    async def get_history(
+        self,
+        db: AsyncSession,
+        sec_uid: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 100,
+    ):
+        """按时间范围查询用户历史, 返回只读结果行
+
+        走 (sec_uid, crawled_at) 复合索引。
+        """
+        query = select(*UserHistory.__table__.columns).where(
+            UserHistory.sec_uid == sec_uid
+        )
+        if start is not None:
+            query = query.where(UserHistory.crawled_at >= start)
+        if end is not None:
+            query = query.where(UserHistory.crawled_at < end)
+        result = await db.execute(
+            query.order_by(UserHistory.crawled_at.desc()).limit(limit)
+        )
+        return result.all()
+
+
+class UserCrawlStateRepository(BaseRepository):
+    """用户视频爬取水位仓储"""
+
+    def __init__(self):
+        super().__init__(UserCrawlState)
+
+    async def get_by_sec_uid(self, db: AsyncSession, sec_uid: str):
         result = await db.execute(
-            select(VideoHistory)
-            .where(VideoHistory.video_id == video_id)
-            .order_by(VideoHistory.crawled_at.desc())
-            .limit(limit)
+            select(UserCrawlState).where(UserCrawlState.sec_uid == sec_uid)
+        )
+        return result.scalar_one_or_none()
+
+    async def save(self, db: AsyncSession, sec_uid: str, **fields):
+        await self._bulk_upsert(db, "sec_uid", [{"sec_uid": sec_uid, **fields}])
+
+    async def full_refresh_due(
+        self, db: AsyncSession, sec_uid: str, interval: int
+    ) -> bool:
+        """距上次完整刷新超过 interval 秒 (或从未完成过)"""
+        state = await self.get_by_sec_uid(db, sec_uid)
+        if state is None or state.newest_create_time is None:
+            # 首次爬取本身就是一次完整遍历
+            return False
+        if state.last_full_refresh is None:
+            return True
+        return datetime.utcnow() - state.last_full_refresh >= timedelta(
+            seconds=interval
         )
-        return result.scalars().all()
 
 
 class CrawlLogRepository(BaseRepository):
@@ -129,6 +423,10 @@ class CrawlLogRepository(BaseRepository):
         db.add(log)
         await db.commit()
 
+    async def add_many(self, db: AsyncSession, rows: List[dict], commit: bool = True):
+        """批量写入爬虫日志"""
+        await self._insert_many(db, rows, commit)
+
     async def get_recent_logs(self, db: AsyncSession, limit: int = 100):
         result = await db.execute(
             select(CrawlLog).order_by(CrawlLog.created_at.desc()).limit(limit)
@@ -156,23 +454,216 @@ class MonitorTaskRepository(BaseRepository):
         name: str = None,
         interval: int = 300,
     ):
-        task = MonitorTask(
-            task_type=task_type,
-            target_id=target_id,
-            name=name or target_id,
-            interval=interval,
+        """创建任务; 同一 (task_type, target_id) 已存在时更新其名称和间隔"""
+        await self.upsert_tasks(
+            db,
+            [
+                {
+                    "task_type": task_type,
+                    "target_id": target_id,
+                    "name": name,
+                    "interval": interval,
+                }
+            ],
         )
-        db.add(task)
-        await db.commit()
-        return task
+        result = await db.execute(
+            select(MonitorTask).where(
+                MonitorTask.task_type == task_type, MonitorTask.target_id == target_id
+            )
+        )
+        return result.scalar_one()
+
+    async def upsert_tasks(
+        self,
+        db: AsyncSession,
+        tasks: List[dict],
+        batch_size: int = IMPORT_BATCH_SIZE,
+    ) -> Dict[str, int]:
+        """批量导入任务, 按 (task_type, target_id) 去重, 每批一个事务
+
+        已存在的任务只更新本次提供的 name/interval, 且仅在值变化时更新
+        (updated_at 随之变化, 调度器据此增量拾取)。
+        """
+        latest: Dict[Tuple[str, str], dict] = {}
+        for task in tasks:
+            latest[(task["task_type"], task["target_id"])] = task
+
+        # 按本次提供的可更新字段分组, 未提供的字段不覆盖已有值
+        groups: Dict[Tuple[str, ...], List[dict]] = {}
+        for task in latest.values():
+            provided = tuple(
+                field for field in ("name", "interval") if task.get(field) is not None
+            )
+            groups.setdefault(provided, []).append(task)
+
+        start = time.perf_counter()
+        count = select(func.count()).select_from(MonitorTask)
+        before = (await db.execute(count)).scalar_one()
+        changed = 0
+        for provided, group in groups.items():
+            stmt = sqlite_insert(MonitorTask.__table__)
+            if provided:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["task_type", "target_id"],
+                    set_={
+                        **{field: stmt.excluded[field] for field in provided},
+                        "updated_at": stmt.excluded.updated_at,
+                    },
+                    where=or_(
+                        *(
+                            getattr(MonitorTask, field) != stmt.excluded[field]
+                            for field in provided
+                        )
+                    ),
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing(
+                    index_elements=["task_type", "target_id"]
+                )
+            for i in range(0, len(group), batch_size):
+                # 每批在提交前取时间戳, 调度器按 updated_at 增量拾取
+                now = datetime.utcnow()
+                rows = [
+                    {
+                        "task_type": task["task_type"],
+                        "target_id": task["target_id"],
+                        "name": task.get("name") or task["target_id"],
+                        "interval": task.get("interval") or 300,
+                        "enabled": True,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                    for task in group[i : i + batch_size]
+                ]
+                # 同一语句 executemany, 编译结果可复用; 每批单独提交
+                connection = await db.connection()
+                result = await connection.execute(stmt, rows)
+                await db.commit()
+                changed += result.rowcount
+        created = (await db.execute(count)).scalar_one() - before
+        WRITE_SECONDS.labels("monitor_tasks", "upsert").observe(
+            time.perf_counter() - start
+        )
+        return {
+            "received": len(tasks),
+            "unique": len(latest),
+            "created": created,
+            "updated": changed - created,
+            "unchanged": len(latest) - changed,
+        }
+
+    async def update(self, db: AsyncSession, task_id: int, **fields):
+        """更新任务字段, 返回更新后的任务"""
+        if fields:
+            await db.execute(
+                update(MonitorTask).where(MonitorTask.id == task_id).values(**fields)
+            )
+            await db.commit()
+        result = await db.execute(select(MonitorTask).where(MonitorTask.id == task_id))
+        return result.scalar_one_or_none()
 
     async def update_last_run(self, db: AsyncSession, task_id: int, success: bool):
-        await db.execute(
+        """记录执行结果 (不改动 updated_at, 它只反映配置变更)"""
+        result = await db.execute(
             update(MonitorTask)
             .where(MonitorTask.id == task_id)
             .values(
                 last_run=datetime.utcnow(),
                 last_status="success" if success else "failed",
+                updated_at=MonitorTask.updated_at,
+            )
+        )
+        await db.commit()
+        return result.rowcount
+
+    async def get_tasks_updated_since(self, db: AsyncSession, since: datetime):
+        """增量获取配置有变更的任务 (含已停用的任务)"""
+        result = await db.execute(
+            select(MonitorTask)
+            .where(MonitorTask.updated_at >= since)
+            .order_by(MonitorTask.updated_at)
+        )
+        return result.scalars().all()
+
+    async def claim_due_tasks(
+        self,
+        db: AsyncSession,
+        owner: str,
+        limit: int = 100,
+        lease_seconds: int = 300,
+    ) -> List[MonitorTask]:
+        """原子地认领一批到期且未被租用的任务"""
+        now = datetime.utcnow()
+        claimable = (
+            MonitorTask.enabled == True,
+            or_(MonitorTask.next_run_at.is_(None), MonitorTask.next_run_at <= now),
+            or_(
+                MonitorTask.lease_expires_at.is_(None),
+                MonitorTask.lease_expires_at < now,
+            ),
+        )
+        due_ids = (
+            select(MonitorTask.id)
+            .where(*claimable)
+            .order_by(MonitorTask.next_run_at.asc().nulls_first())
+            .limit(limit)
+            .scalar_subquery()
+        )
+        result = await db.execute(
+            update(MonitorTask)
+            .where(MonitorTask.id.in_(due_ids), *claimable)
+            .values(
+                owner=owner,
+                lease_expires_at=now + timedelta(seconds=lease_seconds),
+                updated_at=MonitorTask.updated_at,
+            )
+            .returning(MonitorTask)
+            .execution_options(synchronize_session=False)
+        )
+        tasks = result.scalars().all()
+        await db.commit()
+        return tasks
+
+    async def renew_leases(
+        self,
+        db: AsyncSession,
+        owner: str,
+        task_ids: List[int],
+        lease_seconds: int = 300,
+    ) -> int:
+        """续租仍在执行的任务, 返回续租成功的数量"""
+        if not task_ids:
+            return 0
+        result = await db.execute(
+            update(MonitorTask)
+            .where(MonitorTask.id.in_(task_ids), MonitorTask.owner == owner)
+            .values(
+                lease_expires_at=datetime.utcnow() + timedelta(seconds=lease_seconds),
+                updated_at=MonitorTask.updated_at,
+            )
+        )
+        await db.commit()
+        return result.rowcount
+
+    async def release_task(
+        self,
+        db: AsyncSession,
+        task_id: int,
+        owner: str,
+        success: bool,
+        next_run_at: datetime,
+    ):
+        """释放租约并记录执行结果和下次执行时间"""
+        await db.execute(
+            update(MonitorTask)
+            .where(MonitorTask.id == task_id, MonitorTask.owner == owner)
+            .values(
+                owner=None,
+                lease_expires_at=None,
+                next_run_at=next_run_at,
+                last_run=datetime.utcnow(),
+                last_status="success" if success else "failed",
+                updated_at=MonitorTask.updated_at,
             )
         )
         await db.commit()
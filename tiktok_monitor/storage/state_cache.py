@@ -0,0 +1,92 @@
+"""
+最近状态缓存 - 计数未变化时跳过写入
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import User, Video
+
+VIDEO_METRICS = (
+    "digg_count",
+    "share_count",
+    "comment_count",
+    "play_count",
+    "collect_count",
+)
+USER_METRICS = ("follower_count", "following_count", "likes_count", "video_count")
+
+
+class LastStateCache:
+    """按 video_id / sec_uid 记录最近一次写入的计数, LRU淘汰"""
+
+    METRICS = {"video": VIDEO_METRICS, "user": USER_METRICS}
+    KEY_FIELDS = {"video": "video_id", "user": "sec_uid"}
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Any, ...]]" = OrderedDict()
+        self.stats = {"changed": 0, "unchanged": 0, "evicted": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def counters(self, kind: str, row: Dict[str, Any]) -> Tuple[Any, ...]:
+        return tuple(row.get(key, 0) or 0 for key in self.METRICS[kind])
+
+    def get(self, kind: str, key: str) -> Optional[Tuple[Any, ...]]:
+        entry = self._entries.get((kind, key))
+        if entry is not None:
+            self._entries.move_to_end((kind, key))
+        return entry
+
+    def put(self, kind: str, key: str, counters: Tuple[Any, ...]) -> None:
+        self._entries[(kind, key)] = counters
+        self._entries.move_to_end((kind, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evicted"] += 1
+
+    def filter_changed(
+        self, kind: str, key_field: str, rows: Iterable[Dict[str, Any]]
+    ) -> list:
+        """返回计数有变化(或未知)的行; 缓存在提交成功后由 on_write 更新"""
+        changed = []
+        for row in rows:
+            if self.get(kind, row[key_field]) == self.counters(kind, row):
+                self.stats["unchanged"] += 1
+                continue
+            self.stats["changed"] += 1
+            changed.append(row)
+        return changed
+
+    async def on_write(self, grouped: Dict[str, List[Dict[str, Any]]]) -> None:
+        """写入提交后记录各行计数, 写入失败的行下次仍会被视为有变化"""
+        for kind, key_field in self.KEY_FIELDS.items():
+            for row in grouped.get(kind, ()):
+                self.put(kind, row[key_field], self.counters(kind, row))
+
+    async def warm(self, db: AsyncSession) -> int:
+        """从数据库加载最近更新的记录"""
+        loaded = 0
+        for kind, model, key_column in (
+            ("video", Video, Video.video_id),
+            ("user", User, User.sec_uid),
+        ):
+            columns = [getattr(model, name) for name in self.METRICS[kind]]
+            result = await db.execute(
+                select(key_column, *columns)
+                .order_by(model.updated_at.desc())
+                .limit(self.max_entries)
+            )
+            # 按更新时间从旧到新放入, 使最近更新的最后被淘汰
+            for row in reversed(result.all()):
+                self.put(kind, row[0], tuple(value or 0 for value in row[1:]))
+                loaded += 1
+        return loaded
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), **self.stats}
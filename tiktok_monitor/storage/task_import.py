@@ -0,0 +1,69 @@
+"""
+批量导入监控任务 - 解析 JSON / CSV 任务列表
+"""
+
+import csv
+import io
+import json
+from typing import Any, Dict, List
+
+MAX_IMPORT_TASKS = 100000
+IMPORT_FORMATS = ("json", "csv")
+TASK_TYPES = ("video", "user", "user_videos")
+
+
+def _normalize(raw: Dict[str, Any], line: int) -> Dict[str, Any]:
+    task_type = str(raw.get("task_type") or "").strip()
+    target_id = str(raw.get("target_id") or "").strip()
+    if task_type not in TASK_TYPES:
+        raise ValueError(f"Row {line}: unsupported task_type {task_type!r}")
+    if not target_id:
+        raise ValueError(f"Row {line}: missing target_id")
+    task: Dict[str, Any] = {"task_type": task_type, "target_id": target_id}
+    name = raw.get("name")
+    if name is not None and str(name).strip():
+        task["name"] = str(name).strip()
+    interval = raw.get("interval")
+    if interval is not None and str(interval).strip():
+        try:
+            task["interval"] = int(interval)
+        except (TypeError, ValueError):
+            raise ValueError(f"Row {line}: invalid interval {interval!r}")
+        if task["interval"] <= 0:
+            raise ValueError(f"Row {line}: interval must be positive")
+    return task
+
+
+def parse_tasks(data: bytes, fmt: str = "json") -> List[Dict[str, Any]]:
+    """JSON 为任务对象数组(或 {"tasks": [...]}), CSV 需含 task_type,target_id 表头"""
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported import format: {fmt}")
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ValueError("Import body must be UTF-8")
+
+    if fmt == "csv":
+        reader = csv.DictReader(io.StringIO(text))
+        if not reader.fieldnames or not {"task_type", "target_id"} <= set(
+            reader.fieldnames
+        ):
+            raise ValueError("CSV header must include task_type and target_id")
+        rows = list(reader)
+        first_line = 2
+    else:
+        try:
+            rows = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}")
+        if isinstance(rows, dict):
+            rows = rows.get("tasks")
+        if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+            raise ValueError("JSON body must be a list of task objects")
+        first_line = 1
+
+    if not rows:
+        raise ValueError("No tasks given")
+    if len(rows) > MAX_IMPORT_TASKS:
+        raise ValueError(f"At most {MAX_IMPORT_TASKS} tasks per import")
+    return [_normalize(row, first_line + i) for i, row in enumerate(rows)]
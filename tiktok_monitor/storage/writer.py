@@ -0,0 +1,226 @@
+"""
+后写(write-behind)持久化队列 - 单写协程批量落库
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import OperationalError
+
+from core.config import DatabaseConfig, settings
+from core.logger import logger
+from core.metrics import histogram
+from core.resilience import RetryPolicy
+from .database import async_session_maker
+from .repositories import (
+    CrawlLogRepository,
+    UserHistoryRepository,
+    UserRepository,
+    VideoHistoryRepository,
+    VideoRepository,
+)
+
+_STOP = object()
+
+FLUSH_SECONDS = histogram(
+    "tiktok_write_behind_flush_seconds",
+    "Write-behind batch flush duration (all tables, one transaction)",
+).labels()
+
+# SQLite 锁竞争类错误, 稍后重试通常可以成功
+TRANSIENT_ERRORS = (
+    "database is locked",
+    "database is busy",
+    "database table is locked",
+)
+
+# 提交成功后回调, 参数为按类型分组的行
+WriteListener = Callable[[Dict[str, List[Dict[str, Any]]]], Awaitable[None]]
+
+
+class WriteBehindWriter:
+    """有界写队列, 由单个协程按批量/时间窗口合并为事务写入"""
+
+    KINDS = ("video", "user", "video_history", "user_history", "crawl_log")
+
+    def __init__(self, config: DatabaseConfig = None):
+        config = config or settings.database
+        self.queue_size = config.write_queue_size
+        self.batch_size = config.write_batch_size
+        self.flush_interval = config.write_flush_interval
+        self.retry_policy = RetryPolicy(
+            config.write_retries, config.write_retry_backoff, max_delay=5.0
+        )
+        self.video_repo = VideoRepository()
+        self.user_repo = UserRepository()
+        self.history_repo = VideoHistoryRepository()
+        self.user_history_repo = UserHistoryRepository()
+        self.log_repo = CrawlLogRepository()
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.listeners: List[WriteListener] = []
+        self._stats = {
+            "flushes": 0,
+            "rows_written": 0,
+            "rows_dropped": 0,
+            "errors": 0,
+            "retries": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """启动写协程"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run())
+        logger.info("Write-behind writer started")
+
+    async def stop(self) -> None:
+        """停止写协程, 先落库队列中剩余数据"""
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        logger.info("Write-behind writer stopped")
+
+    async def put(self, kind: str, row: Dict[str, Any]) -> None:
+        """入队一行数据, 队列已满时等待(背压)"""
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown write kind: {kind}")
+        if not self.running:
+            raise RuntimeError("Write-behind writer is not running")
+        await self._queue.put((kind, row))
+
+    async def put_many(self, kind: str, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            await self.put(kind, row)
+
+    def metrics(self) -> Dict[str, Any]:
+        flushes = self._stats["flushes"]
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_capacity": self.queue_size,
+            "flushes": flushes,
+            "rows_written": self._stats["rows_written"],
+            "rows_dropped": self._stats["rows_dropped"],
+            "errors": self._stats["errors"],
+            "retries": self._stats["retries"],
+            "last_flush_ms": round(self._stats["last_flush_ms"], 3),
+            "max_flush_ms": round(self._stats["max_flush_ms"], 3),
+            "avg_flush_ms": round(self._stats["total_flush_ms"] / flushes, 3)
+            if flushes
+            else 0.0,
+        }
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch: List[Tuple[str, Dict[str, Any]]] = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+        while not self._queue.empty():
+            batch = []
+            while not self._queue.empty() and len(batch) < self.batch_size:
+                item = self._queue.get_nowait()
+                if item is not _STOP:
+                    batch.append(item)
+            if batch:
+                await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[str, Dict[str, Any]]]) -> None:
+        grouped: Dict[str, List[Dict[str, Any]]] = {kind: [] for kind in self.KINDS}
+        for kind, row in batch:
+            grouped[kind].append(row)
+
+        start = time.perf_counter()
+        for attempt in range(self.retry_policy.max_retries + 1):
+            try:
+                await self._write(grouped)
+                break
+            except Exception as e:
+                if is_transient(e) and attempt < self.retry_policy.max_retries:
+                    self._stats["retries"] += 1
+                    delay = self.retry_policy.delay(attempt)
+                    logger.warning(
+                        f"Write-behind flush of {len(batch)} rows failed "
+                        f"(attempt {attempt + 1}), retrying in {delay:.2f}s: {e}"
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+                self._stats["errors"] += 1
+                self._stats["rows_dropped"] += len(batch)
+                logger.error(f"Write-behind flush of {len(batch)} rows failed: {e}")
+                return
+
+        duration = time.perf_counter() - start
+        FLUSH_SECONDS.observe(duration)
+        elapsed = duration * 1000
+        self._stats["flushes"] += 1
+        self._stats["rows_written"] += len(batch)
+        self._stats["last_flush_ms"] = elapsed
+        self._stats["max_flush_ms"] = max(self._stats["max_flush_ms"], elapsed)
+        self._stats["total_flush_ms"] += elapsed
+        await notify_listeners(self.listeners, grouped)
+
+    async def _write(self, grouped: Dict[str, List[Dict[str, Any]]]) -> None:
+        """在一个事务中写入所有类型的行, 失败时整体回滚"""
+        async with async_session_maker() as db:
+            if grouped["video"]:
+                await self.video_repo.bulk_upsert(db, grouped["video"], commit=False)
+            if grouped["user"]:
+                await self.user_repo.bulk_upsert(db, grouped["user"], commit=False)
+            if grouped["video_history"]:
+                await self.history_repo.add_many(
+                    db, grouped["video_history"], commit=False
+                )
+            if grouped["user_history"]:
+                await self.user_history_repo.add_many(
+                    db, grouped["user_history"], commit=False
+                )
+            if grouped["crawl_log"]:
+                await self.log_repo.add_many(db, grouped["crawl_log"], commit=False)
+            await db.commit()
+
+
+def is_transient(error: Exception) -> bool:
+    """是否为可重试的锁竞争错误"""
+    if not isinstance(error, OperationalError):
+        return False
+    message = str(error).lower()
+    return any(text in message for text in TRANSIENT_ERRORS)
+
+
+async def notify_listeners(
+    listeners: List[WriteListener], grouped: Dict[str, List[Dict[str, Any]]]
+) -> None:
+    for listener in listeners:
+        try:
+            await listener(grouped)
+        except Exception as e:
+            logger.warning(f"Write listener failed: {e}")
@@ -0,0 +1,38 @@
+"""
+测试公共夹具 - 使用临时目录中的独立数据库
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TMP = tempfile.mkdtemp()
+_CONFIG = os.path.join(_TMP, "config.yaml")
+with open(_CONFIG, "w", encoding="utf-8") as f:
+    f.write(f'database:\n  path: "{os.path.join(_TMP, "test.db")}"\n')
+os.environ["TIKTOK_MONITOR_CONFIG"] = _CONFIG
+sys.path.insert(0, PROJECT_ROOT)
+
+
+@pytest.fixture
+def run():
+    """在新的事件循环中执行协程, 结束前释放连接池, 每个测试使用空库"""
+    from storage.database import Base, engine, init_db
+
+    def _run(coro_fn):
+        async def wrapper():
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.drop_all)
+            await init_db()
+            try:
+                return await coro_fn()
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(wrapper())
+
+    return _run
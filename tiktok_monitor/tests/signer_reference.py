@@ -0,0 +1,117 @@
+"""
+X-Bogus签名参考实现 - 优化前的逐字节版本, 供签名测试与基准测试共用
+"""
+
+import base64
+import hashlib
+import time
+
+from core.signer import EMPTY_MD5, XBogusSigner
+
+TIMESTAMP = 1700000000
+MAC_UA = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+)
+ITEM_URL = "https://www.tiktok.com/api/item/detail/?item_id=7234567890123456789"
+LIST_URL = (
+    "https://www.tiktok.com/api/post/item_list/"
+    "?sec_user_id=MS4wLjABAAAA&count=30&cursor=0"
+)
+
+
+class ReferenceSigner:
+    """优化前的逐字节实现 (未缓存UA状态), 用于校验和对比"""
+
+    character = "Dkdpgh4ZKsQB80/Mfvw36XI1R25-WUAlEi7NLboqYTOPuzmFjJnryx9HVGcaStCe="
+    Array = (
+        [None] * 48
+        + list(range(10))
+        + [None] * 7
+        + list(range(10, 16))
+        + [None] * 26
+        + list(range(10, 16))
+    )
+    ua_key = b"\x00\x01\x0c"
+
+    def __init__(self, user_agent: str = None):
+        self.user_agent = user_agent or XBogusSigner().user_agent
+
+    def md5_str_to_array(self, md5_str):
+        if len(md5_str) > 32:
+            return [ord(c) for c in md5_str]
+        array = []
+        for i in range(0, len(md5_str), 2):
+            array.append(
+                (self.Array[ord(md5_str[i])] << 4) | self.Array[ord(md5_str[i + 1])]
+            )
+        return array
+
+    def md5(self, data):
+        if isinstance(data, str):
+            data = self.md5_str_to_array(data)
+        return hashlib.md5(bytes(data)).hexdigest()
+
+    def md5_encrypt(self, url_path):
+        return self.md5_str_to_array(
+            self.md5(self.md5_str_to_array(self.md5(url_path)))
+        )
+
+    def rc4_encrypt(self, key, data):
+        S = list(range(256))
+        j = 0
+        for i in range(256):
+            j = (j + S[i] + key[i % len(key)]) % 256
+            S[i], S[j] = S[j], S[i]
+        result = []
+        i = j = 0
+        for byte in data:
+            i = (i + 1) % 256
+            j = (j + S[i]) % 256
+            S[i], S[j] = S[j], S[i]
+            result.append(byte ^ S[(S[i] + S[j]) % 256])
+        return bytearray(result)
+
+    def calculation(self, a, b, c):
+        x3 = ((a & 255) << 16) | ((b & 255) << 8) | c
+        return (
+            self.character[(x3 & 16515072) >> 18]
+            + self.character[(x3 & 258048) >> 12]
+            + self.character[(x3 & 4032) >> 6]
+            + self.character[x3 & 63]
+        )
+
+    def get_xbogus(self, url_path, timestamp=None):
+        ua_encoded = base64.b64encode(
+            self.rc4_encrypt(self.ua_key, self.user_agent.encode("ISO-8859-1"))
+        ).decode("ISO-8859-1")
+        array1 = self.md5_str_to_array(self.md5(ua_encoded))
+        array2 = self.md5_str_to_array(
+            self.md5(self.md5_str_to_array(EMPTY_MD5))
+        )
+        url_path_array = self.md5_encrypt(url_path)
+        timer = int(time.time()) if timestamp is None else timestamp
+        ct = 536919696
+        new_array = [
+            64, 0.00390625, 1, 12,
+            url_path_array[14], url_path_array[15],
+            array2[14], array2[15], array1[14], array1[15],
+            (timer >> 24) & 255, (timer >> 16) & 255, (timer >> 8) & 255, timer & 255,
+            (ct >> 24) & 255, (ct >> 16) & 255, (ct >> 8) & 255, ct & 255,
+        ]  # fmt: skip
+        xor_result = new_array[0]
+        for i in range(1, len(new_array)):
+            xor_result ^= int(new_array[i])
+        new_array.append(xor_result)
+        array3, array4 = [], []
+        for i in range(0, len(new_array), 2):
+            array3.append(new_array[i])
+            if i + 1 < len(new_array):
+                array4.append(new_array[i + 1])
+        merge_array = [int(v) for v in array3 + array4]
+        garbled_code = ""
+        for i in range(0, len(merge_array) - 2, 3):
+            garbled_code += self.calculation(
+                merge_array[i], merge_array[i + 1], merge_array[i + 2]
+            )
+        return f"{url_path}&X-Bogus={garbled_code}", garbled_code
@@ -0,0 +1,87 @@
+"""
+自适应轮询间隔测试
+"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from core.config import AdaptiveConfig
+from scheduler.adaptive import AdaptiveIntervalPolicy, relative_velocity
+from storage.database import async_session_maker
+from storage.repositories import VideoHistoryRepository
+
+T0 = datetime(2024, 1, 1)
+
+
+def _snapshot(minutes, plays):
+    return SimpleNamespace(
+        crawled_at=T0 + timedelta(minutes=minutes), play_count=plays, digg_count=0
+    )
+
+
+def test_velocity_decays_while_counters_are_unchanged():
+    # 倒序: 10 分钟内播放量 1000 -> 2000
+    history = [_snapshot(10, 2000), _snapshot(0, 1000)]
+    metrics = ("play_count",)
+    fresh = relative_velocity(history, metrics)
+    assert fresh == relative_velocity(history, metrics, T0 + timedelta(minutes=10))
+
+    quiet = relative_velocity(history, metrics, T0 + timedelta(minutes=100))
+    assert quiet == pytest.approx(fresh / 10)
+
+    # 更早的 observed_at 不影响结果
+    assert relative_velocity(history, metrics, T0) == fresh
+
+
+def test_single_snapshot_without_change_is_idle():
+    history = [_snapshot(0, 1000)]
+    assert relative_velocity(history, ("play_count",)) is None
+    assert relative_velocity(history, ("play_count",), T0 + timedelta(hours=1)) == 0
+
+
+def test_next_interval_grows_without_new_snapshots(run):
+    policy = AdaptiveIntervalPolicy(
+        AdaptiveConfig(enabled=True, min_interval=60, max_interval=86400)
+    )
+
+    async def scenario():
+        async with async_session_maker() as db:
+            await VideoHistoryRepository().add_many(
+                db,
+                [
+                    {"video_id": "v1", "play_count": 1000, "crawled_at": T0},
+                    {
+                        "video_id": "v1",
+                        "play_count": 2000,
+                        "crawled_at": T0 + timedelta(minutes=10),
+                    },
+                ],
+            )
+            intervals = []
+            for hours in (0, 6, 48):
+                observed_at = T0 + timedelta(minutes=10, hours=hours)
+                result = await policy.next_interval(
+                    db, 1, "video", "v1", 300, observed_at=observed_at
+                )
+                intervals.append(result["interval"])
+            return intervals
+
+    intervals = run(scenario)
+    assert intervals[0] < intervals[1] < intervals[2]
+
+
+def test_user_videos_keeps_base_interval(run):
+    policy = AdaptiveIntervalPolicy(
+        AdaptiveConfig(enabled=True, min_interval=600, max_interval=86400)
+    )
+
+    async def scenario():
+        async with async_session_maker() as db:
+            return await policy.next_interval(
+                db, 1, "user_videos", "u1", 300, observed_at=T0
+            )
+
+    # 不按 min_interval 截断, 也不因缺少历史快照而退化
+    assert run(scenario) == {"interval": 300, "velocity": None}
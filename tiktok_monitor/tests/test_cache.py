@@ -0,0 +1,234 @@
+"""
+API读缓存测试 - 进程内后端与(模拟的)Redis后端
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from api import cache as cache_module
+from api.cache import (
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    ResponseCache,
+    tags_for_write,
+)
+from core.config import CacheConfig
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.ops = []
+
+    def __getattr__(self, name):
+        def record(*args, **kwargs):
+            self.ops.append((getattr(self.client, name), args, kwargs))
+            return self
+
+        return record
+
+    async def execute(self):
+        return [await op(*args, **kwargs) for op, args, kwargs in self.ops]
+
+
+class FakeRedis:
+    """实现缓存后端用到的 redis.asyncio 命令子集, 带过期时间"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.data = {}
+
+    def _entry(self, key):
+        key = key.decode() if isinstance(key, bytes) else key
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and self.clock() >= entry[1]:
+            del self.data[key]
+            return None
+        return entry
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    async def get(self, key):
+        entry = self._entry(key)
+        return entry[0].encode() if entry is not None else None
+
+    async def set(self, key, value, px=None):
+        expires_at = self.clock() + px / 1000 if px is not None else None
+        self.data[key] = [value, expires_at]
+        return True
+
+    async def sadd(self, key, *members):
+        entry = self._entry(key)
+        if entry is None:
+            entry = self.data[key] = [set(), None]
+        entry[0].update(m.encode() for m in members)
+        return len(members)
+
+    async def pexpire(self, key, ms):
+        entry = self._entry(key)
+        if entry is None:
+            return False
+        entry[1] = self.clock() + ms / 1000
+        return True
+
+    async def smembers(self, key):
+        entry = self._entry(key)
+        return set(entry[0]) if entry is not None else set()
+
+    async def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._entry(key) is not None:
+                del self.data[key.decode() if isinstance(key, bytes) else key]
+                removed += 1
+        return removed
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request, clock):
+    if request.param == "memory":
+        return MemoryCacheBackend(max_entries=100)
+    return RedisCacheBackend(client=FakeRedis(clock), prefix="test:")
+
+
+def test_tags_for_write():
+    rows = [{"video_id": "v1"}, {"video_id": "v2"}, {"video_id": None}]
+    assert tags_for_write("video", rows) == {"video:v1", "video:v2", "videos"}
+    assert tags_for_write("video_history", rows) == {
+        "video_history:v1",
+        "video_history:v2",
+    }
+    assert tags_for_write("crawl_log", rows) == set()
+
+
+def test_backend_roundtrip_and_ttl(backend, clock):
+    async def scenario():
+        await backend.set("a", {"n": 1}, 10, ["video:v1"])
+        assert await backend.get("a") == {"n": 1}
+        clock.now += 9.9
+        assert await backend.get("a") == {"n": 1}
+        clock.now += 0.2
+        assert await backend.get("a") is None
+
+    asyncio.run(scenario())
+
+
+def test_backend_invalidate_by_tag(backend):
+    async def scenario():
+        await backend.set("video", {"id": 1}, 30, ["video:v1"])
+        await backend.set("list", [1, 2], 30, ["videos"])
+        await backend.set("other", {"id": 2}, 30, ["video:v2"])
+        assert await backend.invalidate(["video:v1", "videos", "video:v9"]) == 2
+        assert await backend.get("video") is None
+        assert await backend.get("list") is None
+        assert await backend.get("other") == {"id": 2}
+        assert await backend.invalidate([]) == 0
+
+    asyncio.run(scenario())
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryCacheBackend(max_entries=2)
+
+    async def scenario():
+        await backend.set("a", 1, 30, ["t"])
+        await backend.set("b", 2, 30, ["t"])
+        await backend.get("a")
+        await backend.set("c", 3, 30, ["t"])
+        assert await backend.get("b") is None
+        assert await backend.get("a") == 1
+        assert len(backend) == 2
+        assert await backend.invalidate(["t"]) == 2
+
+    asyncio.run(scenario())
+
+
+def test_response_cache_hits_and_write_invalidation(backend, clock):
+    cache = ResponseCache(backend, CacheConfig(ttl=30))
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return {"video_id": "v1", "play_count": len(loads)}
+
+    async def scenario():
+        first = await cache.get_or_load("video:v1", ["video:v1"], load)
+        second = await cache.get_or_load("video:v1", ["video:v1"], load)
+        assert first == second == {"video_id": "v1", "play_count": 1}
+
+        # 无关的写入不影响, 对应视频的写入使缓存失效
+        await cache.on_write({"video": [{"video_id": "v2"}], "crawl_log": [{}]})
+        assert (await cache.get_or_load("video:v1", ["video:v1"], load))[
+            "play_count"
+        ] == 1
+        await cache.on_write({"video": [{"video_id": "v1", "play_count": 9}]})
+        assert (await cache.get_or_load("video:v1", ["video:v1"], load))[
+            "play_count"
+        ] == 2
+
+        clock.now += 31
+        assert (await cache.get_or_load("video:v1", ["video:v1"], load))[
+            "play_count"
+        ] == 3
+
+    asyncio.run(scenario())
+    assert cache.stats["hits"] == 2 and cache.stats["misses"] == 3
+    assert cache.stats["invalidated"] == 1
+
+
+def test_response_cache_skips_missing_values(backend):
+    cache = ResponseCache(backend, CacheConfig())
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return None
+
+    async def scenario():
+        assert await cache.get_or_load("video:v404", ["video:v404"], load) is None
+        assert await cache.get_or_load("video:v404", ["video:v404"], load) is None
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+
+def test_response_cache_survives_backend_errors():
+    class BrokenBackend:
+        async def get(self, key):
+            raise ConnectionError("redis down")
+
+        async def set(self, key, value, ttl, tags):
+            raise ConnectionError("redis down")
+
+        async def invalidate(self, tags):
+            raise ConnectionError("redis down")
+
+    cache = ResponseCache(BrokenBackend(), CacheConfig())
+
+    async def load():
+        return {"ok": True}
+
+    async def scenario():
+        assert await cache.get_or_load("k", ["t"], load) == {"ok": True}
+        await cache.on_write({"video": [{"video_id": "v1"}]})
+
+    asyncio.run(scenario())
+    assert cache.stats["errors"] == 3
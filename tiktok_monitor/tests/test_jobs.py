@@ -0,0 +1,57 @@
+"""
+批量任务取消测试
+"""
+
+import asyncio
+
+from core.config import CrawlerConfig
+from core.engine import CrawlEngine
+from core.jobs import CrawlJobManager
+
+
+class BlockingManager:
+    """crawl_video 阻塞直到放行, 用于制造执行中的目标"""
+
+    def __init__(self):
+        self.started = None
+        self.release = None
+
+    async def start(self):
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def close(self):
+        pass
+
+    async def crawl_video(self, video_id):
+        self.started.set()
+        await self.release.wait()
+        return True
+
+
+def test_cancel_counts_only_pending_items():
+    async def scenario():
+        manager = BlockingManager()
+        engine = CrawlEngine(manager, CrawlerConfig(concurrency=1))
+        await engine.start()
+        try:
+            job = CrawlJobManager(engine).create("video", ["1", "2", "3"])
+            await manager.started.wait()
+            assert job.counts["running"] == 1
+
+            assert job.cancel() == 2
+            manager.release.set()
+            await asyncio.gather(*job.futures, return_exceptions=True)
+            await asyncio.sleep(0)
+        finally:
+            await engine.stop()
+        return job
+
+    job = asyncio.run(scenario())
+    assert [item["status"] for item in job.items] == [
+        "success",
+        "cancelled",
+        "cancelled",
+    ]
+    assert job.counts["cancelled"] == 2
+    assert job.done
@@ -0,0 +1,99 @@
+"""
+排行榜增量更新测试
+"""
+
+import time
+
+from api.schemas import TopUsers, TopVideos
+from storage.database import async_session_maker
+from storage.leaderboard import Leaderboards
+from storage.repositories import UserRepository, VideoRepository
+
+
+def _video(video_id, play_count, author_id="a1"):
+    return {
+        "video_id": video_id,
+        "play_count": play_count,
+        "author_id": author_id,
+        "create_time": 1700000000,
+    }
+
+
+def test_top_videos_after_write(run):
+    async def scenario():
+        from api import server
+
+        boards = server.leaderboards = Leaderboards()
+        repo = VideoRepository()
+        async with async_session_maker() as db:
+            await repo.bulk_upsert(db, [_video("v1", 100), _video("v2", 50)])
+            first = await server.get_top_videos(metric="play_count", db=db)
+            assert [v["video_id"] for v in first["videos"]] == ["v1", "v2"]
+
+            # 爬虫写入的是不含 id/created_at 的部分行
+            written = [_video("v3", 500), _video("v2", 80)]
+            await repo.bulk_upsert(db, written)
+            await boards.on_write({"video": written})
+
+            body = TopVideos.model_validate(
+                await server.get_top_videos(metric="play_count", db=db)
+            )
+            assert [v.video_id for v in body.videos] == ["v3", "v1", "v2"]
+            assert [v.play_count for v in body.videos] == [500, 100, 80]
+            assert all(v.id is not None and v.created_at for v in body.videos)
+
+            scoped = TopVideos.model_validate(
+                await server.get_top_videos(
+                    metric="play_count", author_id="a1", db=db
+                )
+            )
+            assert scoped.videos[0].video_id == "v3"
+
+    run(scenario)
+
+
+def test_top_users_after_write(run):
+    async def scenario():
+        from api import server
+
+        boards = server.leaderboards = Leaderboards()
+        repo = UserRepository()
+        async with async_session_maker() as db:
+            await repo.bulk_upsert(db, [{"sec_uid": "u1", "follower_count": 10}])
+            await server.get_top_users(db=db)
+
+            written = [{"sec_uid": "u2", "follower_count": 20}]
+            await repo.bulk_upsert(db, written)
+            await boards.on_write({"user": written})
+
+            body = TopUsers.model_validate(await server.get_top_users(db=db))
+            assert [u.sec_uid for u in body.users] == ["u2", "u1"]
+            assert body.users[0].id is not None
+
+    run(scenario)
+
+
+def test_scoped_boards_filter_by_author_and_window(run):
+    async def scenario():
+        boards = Leaderboards()
+        now = int(time.time())
+        repo = VideoRepository()
+        async with async_session_maker() as db:
+            await repo.bulk_upsert(
+                db,
+                [
+                    {**_video("old", 900, "a1"), "create_time": now - 10 * 86400},
+                    {**_video("new", 100, "a1"), "create_time": now - 3600},
+                    {**_video("other", 500, "a2"), "create_time": now - 3600},
+                ],
+            )
+            by_author = await boards.top(db, "video", "play_count", author_id="a1")
+            recent = await boards.top(db, "video", "play_count", window="1d")
+            both = await boards.top(
+                db, "video", "play_count", author_id="a1", window="7d"
+            )
+        assert [v["video_id"] for v in by_author] == ["old", "new"]
+        assert [v["video_id"] for v in recent] == ["other", "new"]
+        assert [v["video_id"] for v in both] == ["new"]
+
+    run(scenario)
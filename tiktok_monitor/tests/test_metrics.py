@@ -0,0 +1,54 @@
+"""
+运行指标测试
+"""
+
+import pytest
+
+from core.metrics import Counter, Gauge, Histogram, MetricsRegistry, _Metric
+
+
+def test_metric_base_is_abstract():
+    with pytest.raises(TypeError):
+        _Metric("base", "abstract base")
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    requests = registry.register(Counter("requests_total", "Requests", ("status",)))
+    depth = registry.register(Gauge("queue_depth", 'Queue "depth"'))
+    latency = registry.register(
+        Histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+    )
+    requests.labels("200").inc()
+    requests.labels("200").inc(2)
+    depth.set(5)
+    latency.observe(0.05)
+    latency.observe(0.5)
+
+    lines = registry.render().splitlines()
+    assert 'requests_total{status="200"} 3' in lines
+    assert '# HELP queue_depth Queue "depth"' in lines
+    assert "queue_depth 5" in lines
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 2' in lines
+    assert "latency_seconds_count 2" in lines
+
+
+def test_remote_snapshots_get_shard_label():
+    registry = MetricsRegistry()
+    requests = registry.register(Counter("requests_total", "Requests"))
+    requests.inc()
+    registry.set_remote("1", registry.snapshot())
+    requests.inc()
+
+    lines = registry.render().splitlines()
+    assert "requests_total 2" in lines
+    assert 'requests_total{shard="1"} 1' in lines
+
+
+def test_register_rejects_conflicting_types():
+    registry = MetricsRegistry()
+    first = registry.register(Counter("events", "Events"))
+    assert registry.register(Counter("events", "Events")) is first
+    with pytest.raises(ValueError):
+        registry.register(Gauge("events", "Events"))
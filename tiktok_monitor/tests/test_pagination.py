@@ -0,0 +1,79 @@
+"""
+键集分页与排序键数据修正测试
+"""
+
+import pytest
+from sqlalchemy import text
+
+from storage.database import async_session_maker, engine, init_db
+from storage.repositories import VideoRepository
+
+
+def _videos(count):
+    rows = []
+    for i in range(count):
+        row = {"video_id": f"v{i}", "play_count": i % 4}
+        if i % 3:
+            row["create_time"] = 1700000000 + i % 5
+        rows.append(row)
+    return rows
+
+
+@pytest.mark.parametrize("sort", ["create_time", "play_count", "id"])
+@pytest.mark.parametrize("descending", [False, True])
+def test_pages_cover_every_row(run, sort, descending):
+    async def scenario():
+        repo = VideoRepository()
+        async with async_session_maker() as db:
+            await repo.bulk_upsert(db, _videos(23))
+            seen, cursor = [], None
+            while True:
+                rows, cursor = await repo.get_page(
+                    db, sort=sort, descending=descending, limit=4, cursor=cursor
+                )
+                seen.extend(row.video_id for row in rows)
+                if cursor is None:
+                    break
+        assert sorted(seen) == sorted(f"v{i}" for i in range(23))
+
+    run(scenario)
+
+
+def test_migration_fills_null_sort_keys(run):
+    async def scenario():
+        async with engine.begin() as conn:
+            await conn.execute(
+                text(
+                    "INSERT INTO videos (video_id, create_time, play_count, "
+                    "created_at, updated_at) VALUES "
+                    "('old', NULL, NULL, '2024-01-01 00:00:00', NULL)"
+                )
+            )
+            await conn.execute(text("PRAGMA user_version = 0"))
+        await init_db()
+        async with engine.connect() as conn:
+            row = (
+                await conn.execute(
+                    text(
+                        "SELECT create_time, play_count, updated_at FROM videos "
+                        "WHERE video_id = 'old'"
+                    )
+                )
+            ).one()
+            assert row == (None, 0, "2024-01-01 00:00:00")
+
+            # 修正只执行一次, 之后的NULL不再被改写
+            await conn.execute(
+                text("UPDATE videos SET play_count = NULL WHERE video_id = 'old'")
+            )
+            await conn.commit()
+        await init_db()
+        async with engine.connect() as conn:
+            value = (
+                await conn.execute(
+                    text("SELECT play_count FROM videos WHERE video_id = 'old'")
+                )
+            ).scalar()
+            assert value is None
+
+    run(scenario)
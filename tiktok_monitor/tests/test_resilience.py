@@ -0,0 +1,115 @@
+"""
+熔断器与请求路径的半开探测测试
+"""
+
+import asyncio
+import json
+
+from core.config import CrawlerConfig
+from core.crawler import TikTokCrawler
+from core.resilience import CircuitBreaker
+
+URL = "https://api.example.com/item"
+
+
+class FakeResponse:
+    def __init__(self, status, body):
+        self.status = status
+        self.headers = {}
+        self._body = body
+
+    async def json(self, content_type=None):
+        return json.loads(self._body)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    closed = False
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        return FakeResponse(*self.responses.pop(0))
+
+
+def _crawler(**overrides):
+    config = CrawlerConfig(
+        request_interval=0,
+        max_retries=0,
+        breaker_failure_threshold=1,
+        breaker_recovery_timeout=0,
+        **overrides,
+    )
+    return TikTokCrawler(config=config)
+
+
+def _half_open(crawler):
+    breaker = crawler._get_breaker("/item")
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    return breaker
+
+
+def test_release_returns_probe():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_invalid_json_settles_probe_as_failure():
+    crawler = _crawler()
+    breaker = _half_open(crawler)
+    crawler._session = FakeSession((200, "<html>blocked</html>"))
+
+    assert asyncio.run(crawler._make_request(URL, need_sign=False)) is None
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow()
+
+
+def test_deadline_exit_releases_probe():
+    crawler = _crawler(request_deadline=0)
+    breaker = _half_open(crawler)
+    crawler._session = FakeSession()
+
+    assert asyncio.run(crawler._make_request(URL, need_sign=False)) is None
+    assert crawler._session.calls == 0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+
+def test_probe_success_closes_breaker():
+    crawler = _crawler()
+    breaker = _half_open(crawler)
+    crawler._session = FakeSession((200, '{"ok": true}'))
+
+    assert asyncio.run(crawler._make_request(URL, need_sign=False)) == {"ok": True}
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_blocked_status_trips_breaker():
+    crawler = _crawler()
+    crawler._session = FakeSession((403, "{}"))
+
+    assert asyncio.run(crawler._make_request(URL, need_sign=False)) is None
+    assert crawler._get_breaker("/item").state == CircuitBreaker.OPEN
+
+
+def test_not_found_does_not_close_breaker():
+    crawler = _crawler()
+    breaker = _half_open(crawler)
+    crawler._session = FakeSession((404, "{}"))
+
+    assert asyncio.run(crawler._make_request(URL, need_sign=False)) is None
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
@@ -0,0 +1,51 @@
+"""
+调度器启动/停止测试
+"""
+
+import asyncio
+
+import pytest
+
+from core.config import SchedulerConfig
+from scheduler.scheduler import Scheduler
+from storage.database import async_session_maker
+from storage.repositories import MonitorTaskRepository
+
+
+class FakeEngine:
+    def __init__(self):
+        self.started = self.stopped = False
+
+    async def start(self):
+        self.started = True
+
+    async def stop(self):
+        self.stopped = True
+
+    async def submit_task(self, task_type, target_id, priority=None):
+        return True
+
+
+@pytest.mark.parametrize("mode", ["local", "lease"])
+def test_start_and_stop_under_asyncio_run(run, mode):
+    # 与 api/server.py 一样, 在事件循环启动之前构造
+    engine = FakeEngine()
+    scheduler = Scheduler(
+        engine,
+        SchedulerConfig(mode=mode, refresh_interval=0.01, claim_poll_interval=0.01),
+    )
+
+    async def scenario():
+        async with async_session_maker() as db:
+            await MonitorTaskRepository().upsert_tasks(
+                db, [{"task_type": "video", "target_id": "v1", "interval": 3600}]
+            )
+        runner = asyncio.create_task(scheduler.start())
+        await asyncio.sleep(0.05)
+        assert scheduler.running
+        await scheduler.stop()
+        await asyncio.wait_for(runner, 1)
+
+    run(scenario)
+    assert engine.started and engine.stopped
+    assert not scheduler.running
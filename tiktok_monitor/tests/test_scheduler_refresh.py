@@ -0,0 +1,67 @@
+"""
+调度器增量拉取任务测试
+"""
+
+from datetime import timedelta
+
+from sqlalchemy import update
+
+from scheduler.scheduler import Scheduler
+from storage.database import async_session_maker
+from storage.models import MonitorTask
+from storage.repositories import MonitorTaskRepository
+
+
+async def _import(*target_ids):
+    async with async_session_maker() as db:
+        await MonitorTaskRepository().upsert_tasks(
+            db, [{"task_type": "video", "target_id": t} for t in target_ids]
+        )
+
+
+async def _stamp(target_id, updated_at):
+    async with async_session_maker() as db:
+        await db.execute(
+            update(MonitorTask)
+            .where(MonitorTask.target_id == target_id)
+            .values(updated_at=updated_at)
+        )
+        await db.commit()
+
+
+def test_refresh_picks_up_late_commits(run):
+    async def scenario():
+        scheduler = Scheduler(engine=None)
+        await scheduler._load_tasks()
+
+        await _import("a")
+        assert await scheduler.refresh() == 1
+        watermark = scheduler._refreshed_at
+
+        # 时间戳早于(或等于)水位线、但之后才提交的任务也要被拾取
+        await _import("b", "c")
+        await _stamp("b", watermark - timedelta(milliseconds=5))
+        await _stamp("c", watermark)
+        assert await scheduler.refresh() == 2
+        assert await scheduler.refresh() == 0
+        assert scheduler.task_count == 3
+
+    run(scenario)
+
+
+def test_refresh_applies_task_changes(run):
+    async def scenario():
+        await _import("a")
+        scheduler = Scheduler(engine=None)
+        await scheduler._load_tasks()
+        assert await scheduler.refresh() == 0
+
+        async with async_session_maker() as db:
+            await MonitorTaskRepository().upsert_tasks(
+                db, [{"task_type": "video", "target_id": "a", "interval": 60}]
+            )
+        assert await scheduler.refresh() == 1
+        entry = next(iter(scheduler._entries.values()))
+        assert entry.interval == 60
+
+    run(scenario)
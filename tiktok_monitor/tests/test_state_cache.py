@@ -0,0 +1,49 @@
+"""
+最近状态缓存测试
+"""
+
+import pytest
+
+from core.crawler import CrawlerManager
+from storage.database import async_session_maker
+from storage.state_cache import LastStateCache
+
+
+def _video(plays):
+    return {"video_id": "v1", "play_count": plays, "digg_count": 1}
+
+
+def test_filter_changed_does_not_remember_rows():
+    cache = LastStateCache()
+    assert cache.filter_changed("video", "video_id", [_video(10)]) == [_video(10)]
+    assert cache.filter_changed("video", "video_id", [_video(10)]) == [_video(10)]
+
+
+def test_on_write_remembers_committed_rows(run):
+    cache = LastStateCache()
+    run(lambda: cache.on_write({"video": [_video(10)], "user": []}))
+    assert cache.filter_changed("video", "video_id", [_video(10)]) == []
+    assert cache.filter_changed("video", "video_id", [_video(11)]) == [_video(11)]
+
+
+def test_failed_write_is_retried(run):
+    async def scenario():
+        manager = CrawlerManager(state_cache=LastStateCache())
+        upsert = manager.video_repo.bulk_upsert
+
+        async def failing(db, rows, commit=True):
+            raise RuntimeError("database is locked")
+
+        manager.video_repo.bulk_upsert = failing
+        with pytest.raises(RuntimeError):
+            await manager._save_videos([_video(10)])
+
+        manager.video_repo.bulk_upsert = upsert
+        await manager._save_videos([_video(10)])
+        async with async_session_maker() as db:
+            video = await manager.video_repo.get_by_video_id(db, "v1")
+        assert video is not None and video.play_count == 10
+        cache = manager.state_cache
+        assert cache.filter_changed("video", "video_id", [_video(10)]) == []
+
+    run(scenario)
@@ -0,0 +1,144 @@
+"""
+用户视频增量/完整爬取测试 - 上游分页用桩替换
+"""
+
+import asyncio
+
+from core.config import CrawlerConfig
+from core.crawler import PINNED_VIDEO_LIMIT, CrawlerManager, TikTokCrawler, aclosing
+from storage.database import async_session_maker
+
+PAGE = 30
+
+
+def _videos(start, count, base=1700000000):
+    """create_time 从新到旧递减的视频列表"""
+    return [
+        {"id": f"v{start + i}", "create_time": base - (start + i)}
+        for i in range(count)
+    ]
+
+
+class FakeFeed:
+    """按游标分页返回固定视频列表, 记录每次请求的游标"""
+
+    def __init__(self, videos):
+        self.videos = videos
+        self.cursors = []
+
+    async def get_user_videos(self, sec_uid, count=30, cursor=0):
+        self.cursors.append(cursor)
+        items = self.videos[cursor : cursor + count]
+        next_cursor = cursor + len(items)
+        return {
+            "items": items,
+            "cursor": next_cursor,
+            "has_more": next_cursor < len(self.videos),
+        }
+
+
+def _manager(feed):
+    manager = CrawlerManager()
+    manager.crawler.get_user_videos = feed.get_user_videos
+    return manager
+
+
+async def _state(manager):
+    async with async_session_maker() as db:
+        return await manager.crawl_state_repo.get_by_sec_uid(db, "u1")
+
+
+def test_first_crawl_is_full_and_sets_watermark(run):
+    async def scenario():
+        feed = FakeFeed(_videos(0, 70))
+        manager = _manager(feed)
+        crawled = await manager.crawl_user_videos("u1", 100, mode="incremental")
+        state = await _state(manager)
+        return feed, crawled, state
+
+    feed, crawled, state = run(scenario)
+    assert crawled == 70
+    assert feed.cursors == [0, 30, 60]
+    assert state.newest_video_id == "v0"
+    assert state.newest_create_time == 1700000000
+    assert state.last_cursor == 0 and state.last_full_refresh is not None
+
+
+def test_incremental_stops_at_watermark(run):
+    async def scenario():
+        manager = _manager(FakeFeed(_videos(0, 70)))
+        await manager.crawl_user_videos("u1", 100, mode="full")
+
+        # 新发布 5 个视频, 排在最前
+        feed = FakeFeed(_videos(-5, 75))
+        manager.crawler.get_user_videos = feed.get_user_videos
+        crawled = await manager.crawl_user_videos("u1", 100, mode="incremental")
+        return feed, crawled, await _state(manager)
+
+    feed, crawled, state = run(scenario)
+    assert feed.cursors == [0]
+    assert crawled == PAGE
+    assert state.newest_video_id == "v-5"
+
+
+def test_pinned_videos_do_not_stop_first_page(run):
+    async def scenario():
+        manager = _manager(FakeFeed(_videos(0, 40)))
+        await manager.crawl_user_videos("u1", 100, mode="full")
+
+        # 首页顶部是置顶的旧视频, 之后是比一页还多的新视频
+        pinned = _videos(0, PINNED_VIDEO_LIMIT)
+        fresh = _videos(-40, 40)
+        feed = FakeFeed(pinned + fresh + _videos(PINNED_VIDEO_LIMIT, 37))
+        manager.crawler.get_user_videos = feed.get_user_videos
+        await manager.crawl_user_videos("u1", 200, mode="incremental")
+        return feed, await _state(manager)
+
+    feed, state = run(scenario)
+    # 第1页已知视频数 == 置顶上限, 继续翻页; 第2页出现旧视频即停止
+    assert feed.cursors == [0, PAGE]
+    assert state.newest_video_id == "v-40"
+
+
+def test_full_mode_resumes_from_saved_cursor(run):
+    async def scenario():
+        videos = _videos(0, 70)
+        feed = FakeFeed(videos)
+        manager = _manager(feed)
+        await manager.crawl_user_videos("u1", PAGE, mode="full")
+        partial = await _state(manager)
+
+        resumed = FakeFeed(videos)
+        manager.crawler.get_user_videos = resumed.get_user_videos
+        await manager.crawl_user_videos("u1", 100, mode="full")
+        return feed, partial, resumed, await _state(manager)
+
+    feed, partial, resumed, state = run(scenario)
+    assert feed.cursors == [0]
+    assert partial.last_cursor == PAGE and partial.last_full_refresh is None
+    assert resumed.cursors == [PAGE, 2 * PAGE]
+    assert state.last_cursor == 0 and state.last_full_refresh is not None
+    assert state.newest_video_id == "v0"
+
+
+def test_closing_iterator_stops_prefetch():
+    async def scenario():
+        feed = FakeFeed(_videos(0, 300))
+        release = asyncio.Event()
+        fetch = feed.get_user_videos
+
+        async def slow(sec_uid, count=30, cursor=0):
+            if cursor:
+                await release.wait()
+            return await fetch(sec_uid, count, cursor)
+
+        crawler = TikTokCrawler(config=CrawlerConfig(page_prefetch=2))
+        crawler.get_user_videos = slow
+        async with aclosing(crawler.iter_user_videos("u1")) as pages:
+            async for _ in pages:
+                break
+        # 预取任务在生成器关闭时已结束, 不会留下挂起的请求
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+        assert feed.cursors == [0]
+
+    asyncio.run(scenario())
@@ -0,0 +1,75 @@
+"""
+后写队列落库重试测试
+"""
+
+import sqlite3
+
+from sqlalchemy.exc import OperationalError
+
+from core.config import DatabaseConfig
+from storage.database import async_session_maker
+from storage.writer import WriteBehindWriter, is_transient
+
+LOCKED = OperationalError("INSERT", {}, sqlite3.OperationalError("database is locked"))
+
+
+def _writer(fail_with, failures):
+    writer = WriteBehindWriter(
+        DatabaseConfig(write_retries=2, write_retry_backoff=0.001)
+    )
+    upsert = writer.video_repo.bulk_upsert
+    calls = {"count": 0}
+
+    async def flaky(db, rows, commit=True):
+        calls["count"] += 1
+        if calls["count"] <= failures:
+            raise fail_with
+        return await upsert(db, rows, commit=commit)
+
+    writer.video_repo.bulk_upsert = flaky
+    return writer
+
+
+def test_is_transient():
+    assert is_transient(LOCKED)
+    assert not is_transient(ValueError("database is locked"))
+    assert not is_transient(
+        OperationalError("INSERT", {}, sqlite3.OperationalError("no such table"))
+    )
+
+
+def test_locked_flush_is_retried(run):
+    writer = _writer(LOCKED, failures=2)
+    written = []
+
+    async def listener(grouped):
+        written.extend(grouped["video"])
+
+    writer.listeners.append(listener)
+
+    async def scenario():
+        await writer._flush([("video", {"video_id": "v1", "play_count": 5})])
+        async with async_session_maker() as db:
+            return await writer.video_repo.get_by_video_id(db, "v1")
+
+    video = run(scenario)
+    assert video is not None and video.play_count == 5
+    assert [row["video_id"] for row in written] == ["v1"]
+    metrics = writer.metrics()
+    assert metrics["retries"] == 2
+    assert metrics["rows_dropped"] == 0 and metrics["rows_written"] == 1
+
+
+def test_rows_dropped_after_retries_exhausted(run):
+    writer = _writer(LOCKED, failures=10)
+    run(lambda: writer._flush([("video", {"video_id": "v1"})]))
+    metrics = writer.metrics()
+    assert metrics["retries"] == 2
+    assert metrics["rows_dropped"] == 1 and metrics["errors"] == 1
+
+
+def test_non_transient_error_is_not_retried(run):
+    writer = _writer(ValueError("bad row"), failures=1)
+    run(lambda: writer._flush([("video", {"video_id": "v1"})]))
+    metrics = writer.metrics()
+    assert metrics["retries"] == 0 and metrics["rows_dropped"] == 1